@@ -1,8 +1,14 @@
 from django.contrib import admin
 
-from .models import Token
+from .models import PendingRevocation, Token
 
 
 @admin.register(Token)
 class TokenAdmin(admin.ModelAdmin):
     readonly_fields = ("expires_in", "issued", "user")
+
+
+@admin.register(PendingRevocation)
+class PendingRevocationAdmin(admin.ModelAdmin):
+    list_display = ("created", "attempts", "next_attempt")
+    readonly_fields = ("created", "attempts", "last_error")
@@ -12,6 +12,13 @@ class DjangoOACConfig(AppConfig):
             settings_oac_keys_check,
             settings_oac_uris_check,
         )
+        from .conf import settings as oac_settings
         from .logger import set_logger
+        from .receivers import user_post_save  # noqa: F401
 
-        set_logger(settings.BASE_DIR / "log")
+        set_logger(
+            settings.BASE_DIR / "log",
+            oac_settings.LOG_ASYNC,
+            oac_settings.LOG_FORMAT,
+            oac_settings.LOG_SAMPLING,
+        )
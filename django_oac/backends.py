@@ -1,4 +1,3 @@
-from logging import LoggerAdapter, getLogger
 from typing import Union
 
 from django.contrib.auth import get_user_model
@@ -6,8 +5,10 @@ from django.http.request import HttpRequest
 
 from .conf import settings as oac_settings
 from .exceptions import NoUserError
-from .logger import get_extra
+from .helpers import get_client_ip_and_state
+from .logger import context_logger, log_context
 from .models_providers.token_provider import TokenProviderBase
+from .tracing import traced
 
 TokenProvider = oac_settings.TOKEN_PROVIDER_CLASS
 UserModel = get_user_model()
@@ -24,6 +25,7 @@ class OAuthClientBackend:
         return user
 
     @staticmethod
+    @traced("django_oac.OAuthClientBackend.authenticate")
     def authenticate(
         request: HttpRequest,
         username: str = None,
@@ -31,21 +33,18 @@ class OAuthClientBackend:
         code: str = None,
         token_provider: TokenProviderBase = TokenProvider(),
     ) -> Union[UserModel, None]:
-        logger = LoggerAdapter(
-            getLogger(__package__),
-            get_extra(
-                "backends.OAuthClientBackend",
-                request.session["OAC_CLIENT_IP"],
-                request.session["OAC_STATE_STR"],
-            ),
-        )
-        try:
-            token = token_provider.create(code)
-        except NoUserError as e_info:
-            logger.info(f"raised django_oac.exceptions.NoUserError: {e_info}")
-            return None
-        else:
-            user = token.user
-
-            logger.info(f"user '{user}' authenticated")
-            return user
+        with log_context(
+            "backends.OAuthClientBackend", *get_client_ip_and_state(request)
+        ):
+            try:
+                token = token_provider.create(code)
+            except NoUserError as e_info:
+                context_logger.info(
+                    "raised django_oac.exceptions.NoUserError: %s", e_info
+                )
+                return None
+            else:
+                user = token.user
+
+                context_logger.info("user '%s' authenticated", user)
+                return user
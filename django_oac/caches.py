@@ -0,0 +1,70 @@
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from threading import Lock
+from typing import Any, Callable, Hashable
+
+
+class LRUCache:
+
+    __slots__ = ("_data", "_lock", "_max_size")
+
+    def __init__(self, max_size: int) -> None:
+        self._data = OrderedDict()
+        self._lock = Lock()
+        self._max_size = max_size
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            try:
+                value, expires_at = self._data[key]
+            except KeyError:
+                return default
+
+            if expires_at <= time.time():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, expires_at: float) -> None:
+        with self._lock:
+            self._data[key] = value, expires_at
+            self._data.move_to_end(key)
+            while len(self._data) > self._max_size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_in_flight = {}
+_in_flight_lock = Lock()
+
+
+def coalesce(key: Hashable, func: Callable) -> Any:
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        is_leader = future is None
+        if is_leader:
+            future = _in_flight[key] = Future()
+
+    if not is_leader:
+        return future.result()
+
+    try:
+        result = func()
+    except BaseException as e_info:
+        future.set_exception(e_info)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        with _in_flight_lock:
+            del _in_flight[key]
@@ -11,11 +11,50 @@ DEFAULTS = {
     "REVOKE_URI": None,
     "REDIRECT_URI": None,
     "JWKS_URI": None,
+    "INTROSPECT_URI": None,
+    "USERINFO_URI": None,
     "CLIENT_ID": None,
     "CLIENT_SECRET": None,
     "SCOPE": "openid",
     "STATE_EXPIRES_IN": 300,
+    "STATELESS_STATE": False,
     "LOOKUP_FIELD": "email",
+    "TIMEOUT": (3.05, 10),
+    "ENDPOINT_TIMEOUTS": {},
+    "REQUEST_DEADLINE": None,
+    "CIRCUIT_BREAKER_THRESHOLD": 5,
+    "CIRCUIT_BREAKER_RESET_TIMEOUT": 30,
+    "RETRY_MAX_ATTEMPTS": 3,
+    "RETRY_BACKOFF_BASE": 0.1,
+    "RETRY_BACKOFF_MAX": 2,
+    "RATE_LIMIT": None,
+    "RATE_LIMIT_MAX_WAIT": 1,
+    "BEARER_AUDIENCE": None,
+    "BEARER_CACHE_SIZE": 1024,
+    "BEARER_REJECTION_CACHE_TIMEOUT": 30,
+    "JWKS_REFETCH_INTERVAL": 10,
+    "INTROSPECTION_CACHE_TIMEOUT": 60,
+    "USERINFO_CACHE_TIMEOUT": 300,
+    "PROFILE_CACHE_TIMEOUT": None,
+    "PROFILE_VERSION_TIMEOUT": 300,
+    "CODE_CACHE_TIMEOUT": 60,
+    "CODE_WAIT_TIMEOUT": 5,
+    "MIDDLEWARE_EXEMPT_PATHS": (),
+    "MIDDLEWARE_EXEMPT_METHODS": (),
+    "MIDDLEWARE_LAZY_TOKEN": False,
+    "TOKEN_CHECK_INTERVAL": None,
+    "REFRESH_GRACE_PERIOD": None,
+    "REFRESH_MAX_WORKERS": 2,
+    "ASYNC_REVOCATION": False,
+    "LOG_ASYNC": False,
+    "LOG_FORMAT": "text",
+    "LOG_SAMPLING": {},
+    "METRICS_VIEW": False,
+    "METRICS_HOOK": None,
+    "TRACING": False,
+    "SERVER_TIMING": False,
+    "REVOCATION_MAX_ATTEMPTS": 5,
+    "REVOCATION_RETRY_DELAY": 60,
     "TOKEN_PROVIDER_CLASS": (
         "django_oac.models_providers.token_provider.DefaultTokenProvider"
     ),
@@ -27,9 +66,21 @@ DEFAULTS = {
 IMPORT_STRINGS = (
     "TOKEN_PROVIDER_CLASS",
     "USER_PROVIDER_CLASS",
+    "METRICS_HOOK",
 )
 
-ALLOWED_NONES = ("STATE_EXPIRES_IN",)
+ALLOWED_NONES = (
+    "STATE_EXPIRES_IN",
+    "TOKEN_CHECK_INTERVAL",
+    "REFRESH_GRACE_PERIOD",
+    "BEARER_AUDIENCE",
+    "INTROSPECT_URI",
+    "USERINFO_URI",
+    "PROFILE_CACHE_TIMEOUT",
+    "REQUEST_DEADLINE",
+    "RATE_LIMIT",
+    "METRICS_HOOK",
+)
 
 APP_NAME = DjangoOACConfig.name
 APP_VERBOSE_NAME = DjangoOACConfig.verbose_name
@@ -75,7 +126,7 @@ class OACSettings:
                 or self._default_settings[item]
             )
 
-        if item in self._import_strings:
+        if item in self._import_strings and val is not None:
             ret = import_from_string(val, item)
         else:
             ret = val
@@ -83,6 +134,12 @@ class OACSettings:
         if ret is None and item not in ALLOWED_NONES:
             raise ConfigurationError(f"missing required setting '{item}'")
 
+        # signed state and its used nonce have to expire
+        if item == "STATE_EXPIRES_IN" and ret is None and self.STATELESS_STATE:
+            raise ConfigurationError(
+                "setting 'STATE_EXPIRES_IN' is required with 'STATELESS_STATE'"
+            )
+
         return ret
 
 
@@ -0,0 +1,51 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Tuple, Union
+
+from .conf import settings as oac_settings
+from .exceptions import DeadlineExceededError
+
+_deadline = ContextVar(f"{__package__}.deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: Union[float, None]) -> Iterator[None]:
+    if seconds is None:
+        yield
+        return
+
+    current = _deadline.get()
+    new = time.monotonic() + seconds
+    token = _deadline.set(new if current is None else min(current, new))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def get_remaining() -> Union[float, None]:
+    current = _deadline.get()
+
+    return None if current is None else current - time.monotonic()
+
+
+def check_deadline() -> None:
+    remaining = get_remaining()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceededError("request deadline exceeded")
+
+
+def get_timeout(endpoint: str) -> Tuple[float, float]:
+    timeout = oac_settings.ENDPOINT_TIMEOUTS.get(endpoint, oac_settings.TIMEOUT)
+    connect, read = (timeout, timeout) if isinstance(timeout, (int, float)) else timeout
+
+    remaining = get_remaining()
+    if remaining is not None:
+        if remaining <= 0:
+            raise DeadlineExceededError(
+                f"request deadline exceeded before calling {endpoint} endpoint"
+            )
+        connect, read = min(connect, remaining), min(read, remaining)
+
+    return connect, read
@@ -1,37 +1,44 @@
 from functools import wraps
-from logging import Logger, LoggerAdapter, getLogger
+from logging import Logger
 from pathlib import Path
-from typing import Callable
+from typing import Callable, Union
 
 import pendulum
 from django.conf import settings
+from django.core.cache import cache
+from django.core.signing import BadSignature
 from django.http import HttpResponse
 from django.http.request import HttpRequest
 from django.shortcuts import render, reverse
 from django.utils import timezone
+from ipware import get_client_ip
 
 from .apps import DjangoOACConfig
 from .conf import settings as oac_settings
-from .logger import get_extra
+from .helpers import get_client_ip_and_state, load_state
+from .logger import context_logger, log_context
+from .server_timing import timing
 
 TEMPLATES_DIR = Path(DjangoOACConfig.name)
 
 
-def _set_logger(scope: str, client_ip: str, state_str: str):
-    return LoggerAdapter(
-        getLogger(__package__), get_extra(scope, client_ip, state_str),
-    )
+def _get_username(request: HttpRequest) -> Union[str, None]:
+    user = getattr(request, "user", None)
+    # lazy user is loaded here, before decorated function runs
+    with timing("oac-user-lookup"):
+        is_authenticated = bool(user) and user.is_authenticated
+    return user.get_username() if is_authenticated else None
 
 
 def populate_view_logger(func) -> Callable:
     @wraps(func)
     def wrapper_populate_view_logger(request: HttpRequest) -> HttpResponse:
-        logger = _set_logger(
+        with log_context(
             f"{func.__module__.split('.')[-1]}.{func.__name__}",
-            request.session.get("OAC_CLIENT_IP", "n/a"),
-            request.session.get("OAC_STATE_STR", "n/a"),
-        )
-        return func(request, logger)
+            *get_client_ip_and_state(request),
+            _get_username(request),
+        ):
+            return func(request, context_logger)
 
     return wrapper_populate_view_logger
 
@@ -41,12 +48,12 @@ def populate_method_logger(func) -> Callable:
     def wrapper_populate_method_logger(
         instance: object, request: HttpRequest
     ) -> HttpResponse:
-        logger = _set_logger(
+        with log_context(
             f"{func.__module__.split('.')[-1]}.{instance.__class__.__name__}",
-            request.session.get("OAC_CLIENT_IP", "n/a"),
-            request.session.get("OAC_STATE_STR", "n/a"),
-        )
-        return func(instance, request, logger)
+            *get_client_ip_and_state(request),
+            _get_username(request),
+        ):
+            return func(instance, request, context_logger)
 
     return wrapper_populate_method_logger
 
@@ -74,15 +81,28 @@ def validate_state_expiration(func) -> Callable:
     def wrapper_validate_state_expiration(
         request: HttpRequest, logger: Logger = None
     ) -> HttpResponse:
-        state_expiration_datetime = pendulum.from_timestamp(
-            request.session.get("OAC_STATE_TIMESTAMP", 0)
-            + oac_settings.STATE_EXPIRES_IN,
-            tz=settings.TIME_ZONE,
-        )
-        if (
-            oac_settings.STATE_EXPIRES_IN is not None
-            and timezone.now() >= state_expiration_datetime
-        ):
+        if oac_settings.STATELESS_STATE:
+            try:
+                load_state(
+                    request.GET.get("state", ""),
+                    max_age=oac_settings.STATE_EXPIRES_IN,
+                )
+            except BadSignature:
+                has_expired = True
+            else:
+                has_expired = False
+        else:
+            state_expiration_datetime = pendulum.from_timestamp(
+                request.session.get("OAC_STATE_TIMESTAMP", 0)
+                + oac_settings.STATE_EXPIRES_IN,
+                tz=settings.TIME_ZONE,
+            )
+            has_expired = (
+                oac_settings.STATE_EXPIRES_IN is not None
+                and timezone.now() >= state_expiration_datetime
+            )
+
+        if has_expired:
             if logger:
                 logger.info("state expired")
             return render(
@@ -101,12 +121,38 @@ def validate_state_expiration(func) -> Callable:
     return wrapper_validate_state_expiration
 
 
+def _match_signed_state(request: HttpRequest) -> bool:
+    try:
+        payload = load_state(request.GET.get("state", ""))
+    except BadSignature:
+        return False
+
+    client_ip, _ = get_client_ip(request)
+    if payload.get("ip") != (client_ip or "unknown"):
+        return False
+
+    # each nonce can be used once, repeated callback is treated as replay,
+    # nothing binds it to the browser which started the login
+    return cache.add(
+        f"{__package__}:state:{payload.get('nonce')}",
+        True,
+        oac_settings.STATE_EXPIRES_IN,
+    )
+
+
 def validate_state_matching(func) -> Callable:
     @wraps(func)
     def wrapper_validate_state_matching(
         request: HttpRequest, logger: Logger = None
     ) -> HttpResponse:
-        if request.GET.get("state") != request.session.get("OAC_STATE_STR"):
+        if oac_settings.STATELESS_STATE:
+            has_matched = _match_signed_state(request)
+        else:
+            has_matched = request.GET.get("state") == request.session.get(
+                "OAC_STATE_STR"
+            )
+
+        if not has_matched:
             err = "CSRF warning, mismatching request and response states"
             if logger:
                 logger.info(err)
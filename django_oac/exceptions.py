@@ -3,6 +3,11 @@ class OACError(Exception):
     pass
 
 
+class CodeReplayError(OACError):
+
+    pass
+
+
 class ConfigurationError(OACError):
 
     pass
@@ -13,6 +18,11 @@ class ExpiredStateError(OACError):
     pass
 
 
+class InactiveTokenError(OACError):
+
+    pass
+
+
 class InsufficientPayloadError(OACError):
 
     pass
@@ -36,3 +46,23 @@ class ProviderRequestError(OACError):
 class ProviderResponseError(OACError):
 
     pass
+
+
+class CircuitOpenError(ProviderRequestError):
+
+    pass
+
+
+class DeadlineExceededError(ProviderRequestError):
+
+    pass
+
+
+class ProviderUnavailableError(ProviderRequestError):
+
+    pass
+
+
+class RateLimitExceededError(ProviderRequestError):
+
+    pass
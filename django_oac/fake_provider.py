@@ -0,0 +1,264 @@
+import json
+import random
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging import getLogger
+from threading import Lock, Thread
+from urllib.parse import parse_qsl, urlencode, urlsplit
+from uuid import uuid4
+
+import jwt
+from jwcrypto.jwk import JWK, JWKSet
+
+logger = getLogger(__package__)
+
+# local stand-in provider, for load testing and benchmarks only
+ENDPOINTS = {
+    "/authorize/": "authorize",
+    "/token/": "token",
+    "/revoke/": "revoke",
+    "/jwks/": "jwks",
+}
+
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+
+    server_version = "FakeOIDCProvider"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        self.dispatch()
+
+    def do_POST(self) -> None:
+        self.dispatch()
+
+    def dispatch(self) -> None:
+        provider = self.server.provider
+        url = urlsplit(self.path)
+        endpoint = ENDPOINTS.get(url.path)
+        params = dict(parse_qsl(url.query))
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            params.update(parse_qsl(self.rfile.read(length).decode("utf-8")))
+
+        if endpoint is None:
+            self.respond(404, {"error": "not_found"})
+            return
+
+        provider.count(endpoint)
+        if provider.latency:
+            time.sleep(provider.latency)
+        if provider.error_rate and random.random() < provider.error_rate:
+            self.respond(
+                provider.error_status,
+                {"error": "temporarily_unavailable"},
+                {"Retry-After": "0"},
+            )
+            return
+
+        status, body, headers = getattr(provider, endpoint)(self.command, params)
+        self.respond(status, body, headers)
+
+    def respond(self, status: int, body: dict = None, headers: dict = None) -> None:
+        content = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        if body is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug("fake provider: " + format, *args)
+
+
+class FakeProvider:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        client_id: str = None,
+        client_secret: str = None,
+        expires_in: int = 3600,
+        latency: float = 0,
+        error_rate: float = 0,
+        error_status: int = 503,
+        rotate_every: float = None,
+        keep_keys: int = 2,
+    ) -> None:
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.expires_in = expires_in
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rotate_every = rotate_every
+        self.keep_keys = keep_keys
+        self.calls = Counter()
+        self._codes = {}
+        self._refresh_tokens = {}
+        self._keys = []
+        self._rotated = None
+        self._lock = Lock()
+        self._thread = None
+        self.server = ThreadingHTTPServer((host, port), FakeProviderHandler)
+        self.server.provider = self
+        self.rotate_key()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, endpoint: str) -> str:
+        return f"{self.base_url}/{endpoint}/"
+
+    @property
+    def kid(self) -> str:
+        return self._keys[-1][0]
+
+    def rotate_key(self) -> str:
+        kid = uuid4().hex
+        key = JWK.generate(kty="RSA", size=2048, use="sig", alg="RS256", kid=kid)
+        pem = key.export_to_pem(private_key=True, password=None)
+        with self._lock:
+            # previous keys stay published, so tokens signed with them verify
+            keys = [*self._keys, (kid, key, pem)]
+            start = max(len(keys) - self.keep_keys, 0)
+            self._keys = keys[start:]
+            self._rotated = time.monotonic()
+        logger.info("fake provider signs with key '%s'", kid)
+
+        return kid
+
+    def count(self, endpoint: str) -> None:
+        with self._lock:
+            self.calls[endpoint] += 1
+
+    def start(self) -> "FakeProvider":
+        self._thread = Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeProvider":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> bool:
+        self.stop()
+        return False
+
+    def _check_client(self, params: dict) -> bool:
+        return (
+            self.client_id is None or params.get("client_id") == self.client_id
+        ) and (
+            self.client_secret is None
+            or params.get("client_secret") == self.client_secret
+        )
+
+    def _issue(self, subject: str, with_id_token: bool) -> dict:
+        refresh_token = uuid4().hex
+        with self._lock:
+            self._refresh_tokens[refresh_token] = subject
+        data = {
+            "access_token": uuid4().hex,
+            "refresh_token": refresh_token,
+            "token_type": "Bearer",
+            "expires_in": self.expires_in,
+        }
+        if with_id_token:
+            data["id_token"] = self.id_token(subject)
+
+        return data
+
+    def id_token(self, subject: str) -> str:
+        if (
+            self.rotate_every is not None
+            and time.monotonic() - self._rotated >= self.rotate_every
+        ):
+            self.rotate_key()
+
+        kid, _, pem = self._keys[-1]
+        now = int(time.time())
+        payload = {
+            "iss": self.base_url,
+            "sub": subject,
+            "aud": self.client_id or "fake-client",
+            "iat": now,
+            "exp": now + self.expires_in,
+            "email": f"{subject}@fake.provider",
+            "first_name": subject,
+            "last_name": "Fake",
+        }
+
+        return jwt.encode(payload, pem, algorithm="RS256", headers={"kid": kid}).decode(
+            "utf-8"
+        )
+
+    def authorize(self, method: str, params: dict) -> tuple:
+        if "redirect_uri" not in params:
+            return 400, {"error": "invalid_request"}, None
+        if self.client_id is not None and params.get("client_id") != self.client_id:
+            return 400, {"error": "unauthorized_client"}, None
+
+        # login hint picks the user, so load tests can simulate many of them
+        code = uuid4().hex
+        with self._lock:
+            self._codes[code] = params.get("login_hint") or "user"
+
+        query = {"code": code}
+        if "state" in params:
+            query["state"] = params["state"]
+
+        return 302, None, {"Location": f"{params['redirect_uri']}?{urlencode(query)}"}
+
+    def token(self, method: str, params: dict) -> tuple:
+        if method != "POST":
+            return 405, {"error": "invalid_request"}, None
+        if not self._check_client(params):
+            return 401, {"error": "invalid_client"}, None
+
+        grant_type = params.get("grant_type")
+        if grant_type == "authorization_code":
+            with self._lock:
+                subject = self._codes.pop(params.get("code"), None)
+            with_id_token = True
+        elif grant_type == "refresh_token":
+            with self._lock:
+                subject = self._refresh_tokens.pop(params.get("refresh_token"), None)
+            with_id_token = False
+        else:
+            return 400, {"error": "unsupported_grant_type"}, None
+
+        if subject is None:
+            return 400, {"error": "invalid_grant"}, None
+
+        return 200, self._issue(subject, with_id_token), {"Cache-Control": "no-store"}
+
+    def revoke(self, method: str, params: dict) -> tuple:
+        if method != "POST":
+            return 405, {"error": "invalid_request"}, None
+        if not self._check_client(params):
+            return 401, {"error": "invalid_client"}, None
+
+        # unknown tokens are not an error, as RFC 7009 says
+        with self._lock:
+            self._refresh_tokens.pop(params.get("token"), None)
+
+        return 200, None, None
+
+    def jwks(self, method: str, params: dict) -> tuple:
+        jwks = JWKSet()
+        for _, key, _ in self._keys:
+            jwks.add(key)
+
+        return 200, json.loads(jwks.export(private_keys=False)), None
@@ -1,7 +1,68 @@
-from typing import Union
+import time
+from typing import Tuple, Union
+
+from django.core import signing
+from django.core.cache import cache
+from django.http.request import HttpRequest
+from ipware import get_client_ip
+
+from .conf import settings as oac_settings
+
+STATE_SALT = f"{__package__}.state"
 
 
 def get_missing_keys(required: set, given: Union[list, set, tuple]) -> str:
     return ", ".join(
         reversed(list(map(lambda key: f"'{key}'", required.difference(given))))
     )
+
+
+def sign_state(state_str: str, client_ip: str) -> str:
+    return signing.dumps(
+        {"nonce": state_str, "ip": client_ip}, salt=STATE_SALT, compress=True
+    )
+
+
+def load_state(state: str, max_age: int = None) -> dict:
+    return signing.loads(state, salt=STATE_SALT, max_age=max_age)
+
+
+def get_client_ip_and_state(request: HttpRequest) -> Tuple[str, str]:
+    if not oac_settings.STATELESS_STATE:
+        return (
+            request.session.get("OAC_CLIENT_IP", "n/a"),
+            request.session.get("OAC_STATE_STR", "n/a"),
+        )
+
+    client_ip, _ = get_client_ip(request)
+    try:
+        state_str = load_state(request.GET.get("state", "")).get("nonce", "n/a")
+    except signing.BadSignature:
+        state_str = "n/a"
+
+    return client_ip or "unknown", state_str
+
+
+def _get_profile_version_key(user_pk: str) -> str:
+    return f"{__package__}:profile_version:{user_pk}"
+
+
+def get_profile_version(user_pk: str) -> float:
+    cache_key = _get_profile_version_key(user_pk)
+
+    # version expires, so changes missed by post_save, ie. QuerySet.update(),
+    # are served at most PROFILE_VERSION_TIMEOUT seconds late
+    version = cache.get(cache_key)
+    if version is None:
+        cache.add(cache_key, time.time(), oac_settings.PROFILE_VERSION_TIMEOUT)
+        version = cache.get(cache_key)
+
+    return version
+
+
+def bump_profile_version(user_pk: str) -> None:
+    cache.set(
+        _get_profile_version_key(user_pk),
+        time.time(),
+        oac_settings.PROFILE_VERSION_TIMEOUT,
+    )
@@ -1,32 +1,144 @@
-from logging import Formatter, getLogger
-from logging.handlers import RotatingFileHandler
+import atexit
+import json
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from copy import copy
+from logging import ERROR, Filter, Formatter, LoggerAdapter, LogRecord, getLogger
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
+from queue import SimpleQueue
+from typing import Iterator, Union
+
+from .exceptions import ConfigurationError
+
+_context: ContextVar[Union[dict, None]] = ContextVar(
+    f"{__package__}.log_context", default=None
+)
 
 
 def get_extra(scope: str, client_ip: str = "n/a", state_str: str = "n/a") -> dict:
     return {
         "scope": scope,
+        "client_ip": client_ip,
+        "state": state_str,
         "ip_state": f"{client_ip}:{state_str}",
     }
 
 
-def set_logger(log_dir: Path):
-    if not log_dir.is_dir():
-        log_dir.mkdir(parents=True)
+def get_context() -> dict:
+    return _context.get() or get_extra("n/a")
 
-    logger = getLogger(__package__)
 
-    file_handler = RotatingFileHandler(
-        (log_dir / f"{__package__}.log").as_posix(), maxBytes=(5 * 1024 ** 2),
-    )
-    file_handler.setFormatter(
-        Formatter(
+@contextmanager
+def log_context(
+    scope: str, client_ip: str = "n/a", state_str: str = "n/a", user: str = None
+) -> Iterator[None]:
+    token = _context.set({**get_extra(scope, client_ip, state_str), "user": user})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+class ContextAdapter(LoggerAdapter):
+    def __init__(self, logger=None) -> None:
+        super().__init__(logger or getLogger(__package__), {})
+
+    def process(self, msg, kwargs):
+        kwargs["extra"] = {**get_context(), **kwargs.get("extra", {})}
+        return msg, kwargs
+
+
+class ContextFilter(Filter):
+    def filter(self, record: LogRecord) -> bool:
+        for key, value in get_context().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class SamplingFilter(Filter):
+    def __init__(self, rates: dict) -> None:
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: LogRecord) -> bool:
+        # errors are never sampled out
+        if record.levelno >= ERROR:
+            return True
+
+        rate = self.rates.get(getattr(record, "event", None), 1)
+        return rate >= 1 or random.random() < rate
+
+
+class JSONFormatter(Formatter):
+
+    FIELDS = ("scope", "client_ip", "state", "user", "event", "duration")
+
+    def format(self, record: LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            **{field: getattr(record, field, None) for field in self.FIELDS},
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+
+        return json.dumps(data, default=str)
+
+
+class LazyQueueHandler(QueueHandler):
+    def prepare(self, record: LogRecord) -> LogRecord:
+        # message is formatted by listener thread, not by caller
+        return copy(record)
+
+
+context_logger = ContextAdapter()
+
+
+def get_formatter(log_format: str) -> Formatter:
+    if log_format == "json":
+        return JSONFormatter()
+    if log_format == "text":
+        return Formatter(
             "%(asctime)s"
             " - %(scope)s"
             " - %(ip_state)s"
             " - %(levelname)s"
             " - %(message)s"
         )
+
+    raise ConfigurationError(f"unknown log format '{log_format}'")
+
+
+def set_logger(
+    log_dir: Path,
+    use_queue: bool = False,
+    log_format: str = "text",
+    sampling: dict = None,
+):
+    if not log_dir.is_dir():
+        log_dir.mkdir(parents=True)
+
+    logger = getLogger(__package__)
+
+    file_handler = RotatingFileHandler(
+        (log_dir / f"{__package__}.log").as_posix(), maxBytes=(5 * 1024 ** 2),
     )
-    logger.addHandler(file_handler)
+    file_handler.setFormatter(get_formatter(log_format))
+    if use_queue:
+        queue = SimpleQueue()
+        handler = LazyQueueHandler(queue)
+        listener = QueueListener(queue, file_handler, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+    else:
+        handler = file_handler
+    handler.addFilter(ContextFilter())
+    if sampling:
+        handler.addFilter(SamplingFilter(sampling))
+    logger.addHandler(handler)
     logger.setLevel("INFO")
@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand
+
+from ...conf import settings as oac_settings
+from ...fake_provider import FakeProvider
+
+
+class Command(BaseCommand):
+    help = "Runs local stand-in OpenID Connect provider for load testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--host",
+            default="127.0.0.1",
+            help="address to listen on",
+        )
+        parser.add_argument(
+            "--port",
+            default=8765,
+            type=int,
+            help="port to listen on",
+        )
+        parser.add_argument(
+            "--expires-in",
+            default=3600,
+            type=int,
+            help="lifetime of issued access tokens in seconds",
+        )
+        parser.add_argument(
+            "--latency",
+            default=0.0,
+            type=float,
+            help="seconds every response is delayed by",
+        )
+        parser.add_argument(
+            "--error-rate",
+            default=0.0,
+            type=float,
+            help="share of requests answered with error, between 0 and 1",
+        )
+        parser.add_argument(
+            "--error-status",
+            default=503,
+            type=int,
+            help="status code of injected errors",
+        )
+        parser.add_argument(
+            "--rotate-every",
+            default=None,
+            type=float,
+            help="seconds after which new signing key is generated",
+        )
+
+    def handle(self, *args, **options):
+        provider = FakeProvider(
+            host=options["host"],
+            port=options["port"],
+            client_id=oac_settings.CLIENT_ID,
+            client_secret=oac_settings.CLIENT_SECRET,
+            expires_in=options["expires_in"],
+            latency=options["latency"],
+            error_rate=options["error_rate"],
+            error_status=options["error_status"],
+            rotate_every=options["rotate_every"],
+        )
+
+        self.stdout.write(f"fake provider listening on {provider.base_url}")
+        for endpoint in ("authorize", "token", "revoke", "jwks"):
+            self.stdout.write(f"  {endpoint.upper()}_URI: {provider.url(endpoint)}")
+
+        try:
+            provider.server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            provider.server.server_close()
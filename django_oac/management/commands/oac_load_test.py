@@ -0,0 +1,226 @@
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Dict, List, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from django.contrib.auth import SESSION_KEY
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ...conf import settings as oac_settings
+from ...exceptions import OACError
+from ...fake_provider import FakeProvider
+from ...metrics import metrics
+from ...models import Token
+
+STEPS = ("authenticate", "callback", "request", "refresh", "logout")
+
+
+def percentile(values: List[float], share: float) -> float:
+    if not values:
+        return 0.0
+
+    values = sorted(values)
+
+    return values[min(len(values) - 1, int(share * len(values)))]
+
+
+def get_provider_calls() -> Dict[str, float]:
+    counters, _ = metrics.collect()
+    calls = defaultdict(float)
+    for (name, labels), value in counters.items():
+        if name == "provider_requests":
+            calls[dict(labels)["endpoint"]] += value
+
+    return calls
+
+
+# walks through login, requests, token expiry and logout as browser would
+class SimulatedUser:
+    def __init__(self, login_hint: str, path: str, requests_count: int) -> None:
+        self.login_hint = login_hint
+        self.path = path
+        self.requests_count = requests_count
+        self.client = Client()
+        self.samples: List[Tuple[str, float, int]] = []
+        self.error = None
+
+    def get(self, step: str, path: str, data: dict = None, status: int = None):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = self.client.get(path, data)
+            elapsed = time.perf_counter() - started
+        self.samples.append((step, elapsed, len(queries)))
+
+        if status is not None and response.status_code != status:
+            raise OACError(f"{step} responded with code {response.status_code}")
+
+        return response
+
+    def run(self) -> "SimulatedUser":
+        # failed user stops, but the rest of the load keeps going
+        try:
+            response = self.get(
+                "authenticate", reverse("django_oac:authenticate"), status=302
+            )
+
+            # browser part of authorization, provider redirects back with code
+            authorized = requests.get(
+                f"{response['Location']}&login_hint={self.login_hint}",
+                allow_redirects=False,
+                timeout=oac_settings.TIMEOUT,
+            )
+            query = urlsplit(authorized.headers.get("Location", "")).query
+            self.get(
+                "callback", f"{reverse('django_oac:callback')}?{query}", status=302
+            )
+
+            for _ in range(self.requests_count):
+                self.get("request", self.path)
+
+            Token.objects.filter(user_id=self.client.session[SESSION_KEY]).update(
+                expires_in=0
+            )
+            self.get("refresh", self.path)
+
+            self.get("logout", reverse("django_oac:logout"))
+        except Exception as err:
+            self.error = f"{type(err).__name__}: {err}"
+        finally:
+            connection.close()
+
+        return self
+
+
+class Command(BaseCommand):
+    help = (
+        "Drives concurrent simulated users through login, authenticated"
+        " requests, token refresh and logout, and reports latencies."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users",
+            default=10,
+            type=int,
+            help="number of simulated users",
+        )
+        parser.add_argument(
+            "--concurrency",
+            default=None,
+            type=int,
+            help="number of users active at once, all of them by default",
+        )
+        parser.add_argument(
+            "--requests",
+            default=5,
+            type=int,
+            help="number of authenticated requests made by every user",
+        )
+        parser.add_argument(
+            "--path",
+            default=None,
+            help="path requested by authenticated users, profile view by default",
+        )
+        parser.add_argument(
+            "--fake-provider",
+            action="store_true",
+            help="run local provider on address of TOKEN_URI setting",
+        )
+        parser.add_argument(
+            "--latency",
+            default=0.0,
+            type=float,
+            help="seconds every response of local provider is delayed by",
+        )
+        parser.add_argument(
+            "--error-rate",
+            default=0.0,
+            type=float,
+            help="share of requests answered with error by local provider",
+        )
+
+    def handle(self, *args, **options):
+        if options["users"] < 1:
+            raise CommandError("at least one user is required")
+
+        provider = nullcontext()
+        if options["fake_provider"]:
+            token_uri = urlsplit(oac_settings.TOKEN_URI)
+            provider = FakeProvider(
+                host=token_uri.hostname,
+                port=token_uri.port or 80,
+                client_id=oac_settings.CLIENT_ID,
+                client_secret=oac_settings.CLIENT_SECRET,
+                latency=options["latency"],
+                error_rate=options["error_rate"],
+            )
+
+        users = [
+            SimulatedUser(
+                f"load-test-{index}",
+                options["path"] or reverse("django_oac:profile"),
+                options["requests"],
+            )
+            for index in range(options["users"])
+        ]
+
+        with provider:
+            calls_before = get_provider_calls()
+            started = time.perf_counter()
+            with ThreadPoolExecutor(
+                max_workers=options["concurrency"] or options["users"]
+            ) as executor:
+                list(executor.map(SimulatedUser.run, users))
+            elapsed = time.perf_counter() - started
+            calls_after = get_provider_calls()
+
+        self.report(users, elapsed, calls_before, calls_after)
+
+    def report(
+        self,
+        users: List[SimulatedUser],
+        elapsed: float,
+        calls_before: Dict[str, float],
+        calls_after: Dict[str, float],
+    ) -> None:
+        samples = defaultdict(list)
+        for user in users:
+            for step, duration, queries in user.samples:
+                samples[step].append((duration, queries))
+        failed = [user for user in users if user.error]
+
+        total = sum(len(step_samples) for step_samples in samples.values())
+        self.stdout.write(
+            f"users: {len(users)}, failed: {len(failed)}, requests: {total},"
+            f" time: {elapsed:.2f} s, throughput: {total / elapsed:.1f} requests/s"
+        )
+
+        self.stdout.write(
+            f"{'step':<14}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+            f"{'queries':>9}"
+        )
+        for step in STEPS:
+            durations = [duration * 1000 for duration, _ in samples[step]]
+            queries = [count for _, count in samples[step]]
+            self.stdout.write(
+                f"{step:<14}{len(durations):>7}"
+                f"{percentile(durations, 0.5):>10.1f}"
+                f"{percentile(durations, 0.95):>10.1f}"
+                f"{percentile(durations, 0.99):>10.1f}"
+                f"{sum(queries) / max(len(queries), 1):>9.1f}"
+            )
+
+        self.stdout.write("provider calls per user:")
+        for endpoint in sorted(calls_after):
+            calls = calls_after[endpoint] - calls_before.get(endpoint, 0)
+            self.stdout.write(f"  {endpoint}: {calls / len(users):.2f}")
+
+        for user in failed:
+            self.stderr.write(f"{user.login_hint} failed: {user.error}")
@@ -0,0 +1,133 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from logging import getLogger
+from typing import List, Tuple, Union
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from requests.exceptions import RequestException
+
+from ...conf import settings as oac_settings
+from ...exceptions import OACError
+from ...models import PendingRevocation
+from ...services import OAuthRequestService
+
+logger = getLogger(__package__)
+
+
+class Command(BaseCommand):
+    help = "Revokes refresh tokens queued on logout."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            default=100,
+            type=int,
+            help="number of queued tokens claimed at once",
+        )
+        parser.add_argument(
+            "--concurrency",
+            default=4,
+            type=int,
+            help="number of revocation requests sent in parallel",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="keep polling the queue instead of exiting once it is empty",
+        )
+        parser.add_argument(
+            "--interval",
+            default=5.0,
+            type=float,
+            help="seconds between polls of the empty queue in loop mode",
+        )
+
+    def handle(self, *args, **options):
+        service = OAuthRequestService()
+
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            while True:
+                batch = self.claim(options["batch_size"])
+                if batch:
+                    revoked, failed = self.process(batch, service, executor)
+                    self.stdout.write(f"revoked: {revoked}, failed: {failed}")
+                elif options["loop"]:
+                    time.sleep(options["interval"])
+                else:
+                    break
+
+    @staticmethod
+    def claim(batch_size: int) -> List[PendingRevocation]:
+        now = timezone.now()
+        # rows locked by concurrent workers are skipped, on databases without
+        # SELECT ... FOR UPDATE the lease set below keeps them apart
+        with transaction.atomic():
+            batch = list(
+                PendingRevocation.objects.select_for_update(skip_locked=True)
+                .filter(
+                    attempts__lt=oac_settings.REVOCATION_MAX_ATTEMPTS,
+                    next_attempt__lte=now,
+                )
+                .order_by("next_attempt")[:batch_size]
+            )
+            PendingRevocation.objects.filter(
+                pk__in=[revocation.pk for revocation in batch]
+            ).update(
+                next_attempt=now
+                + timedelta(seconds=oac_settings.REVOCATION_RETRY_DELAY)
+            )
+
+        return batch
+
+    def process(
+        self,
+        batch: List[PendingRevocation],
+        service: OAuthRequestService,
+        executor: ThreadPoolExecutor,
+    ) -> Tuple[int, int]:
+        results = executor.map(
+            lambda revocation: self.revoke(revocation, service), batch
+        )
+
+        revoked = []
+        failed = 0
+        for revocation, error in zip(batch, results):
+            if error is None:
+                revoked.append(revocation.pk)
+                continue
+
+            failed += 1
+            revocation.attempts += 1
+            revocation.last_error = error
+            revocation.next_attempt = timezone.now() + timedelta(
+                seconds=oac_settings.REVOCATION_RETRY_DELAY
+                * 2 ** (revocation.attempts - 1)
+            )
+            revocation.save(update_fields=["attempts", "last_error", "next_attempt"])
+
+            if revocation.attempts >= oac_settings.REVOCATION_MAX_ATTEMPTS:
+                logger.error(
+                    "giving up revoking refresh token queued on %s"
+                    " after %d attempts: %s",
+                    revocation.created,
+                    revocation.attempts,
+                    error,
+                )
+
+        PendingRevocation.objects.filter(pk__in=revoked).delete()
+
+        return len(revoked), failed
+
+    @staticmethod
+    def revoke(
+        revocation: PendingRevocation, service: OAuthRequestService
+    ) -> Union[str, None]:
+        try:
+            service.revoke_refresh_token(revocation.refresh_token)
+        except (OACError, RequestException) as err:
+            return f"{type(err).__name__}: {err}"
+
+        return None
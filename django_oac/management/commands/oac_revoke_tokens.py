@@ -0,0 +1,151 @@
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import timedelta
+from logging import getLogger
+from typing import Deque, List, Tuple, Union
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import QuerySet
+from django.utils import timezone
+from requests.exceptions import RequestException
+
+from ...conf import settings as oac_settings
+from ...exceptions import OACError
+from ...models import Token
+from ...services import OAuthRequestService
+
+logger = getLogger(__package__)
+
+
+class Command(BaseCommand):
+    help = "Revokes refresh tokens of selected users and deletes their tokens."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            action="append",
+            default=[],
+            dest="users",
+            help="revoke tokens of user with given email, can be repeated",
+        )
+        parser.add_argument(
+            "--older-than",
+            type=int,
+            help="revoke tokens issued more than given number of seconds ago",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="revoke all tokens",
+        )
+        parser.add_argument(
+            "--concurrency",
+            default=8,
+            type=int,
+            help="number of revocation requests sent in parallel",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            help="maximum number of revocation requests sent per second",
+        )
+        parser.add_argument(
+            "--batch-size",
+            default=500,
+            type=int,
+            help="number of rows fetched and deleted at once",
+        )
+
+    def handle(self, *args, **options):
+        if not (options["users"] or options["older_than"] or options["all"]):
+            raise CommandError("pass --user, --older-than or --all")
+
+        rows = self.get_queryset(options["users"], options["older_than"]).values_list(
+            "pk", "refresh_token"
+        )
+        service = OAuthRequestService()
+        interval = 1 / options["rate"] if options["rate"] else 0
+        batch_size = options["batch_size"]
+
+        started = time.monotonic()
+        next_send = started
+        pending: Deque[Tuple[int, Future]] = deque()
+        revoked: List[int] = []
+        self.revoked = self.failed = 0
+
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            last_pk = 0
+            while True:
+                # batch is read whole before anything is deleted, SQLite does
+                # not isolate deletes from cursor open on the same table
+                batch = list(rows.filter(pk__gt=last_pk)[:batch_size])
+                if not batch:
+                    break
+                last_pk = batch[-1][0]
+
+                for pk, refresh_token in batch:
+                    # keep at most two requests per worker waiting in the pool
+                    while len(pending) >= options["concurrency"] * 2:
+                        self.collect(pending.popleft(), revoked)
+
+                    if interval:
+                        delay = next_send - time.monotonic()
+                        if delay > 0:
+                            time.sleep(delay)
+                        next_send = max(next_send, time.monotonic()) + interval
+
+                    pending.append(
+                        (pk, executor.submit(self.revoke, refresh_token, service))
+                    )
+
+                if len(revoked) >= batch_size:
+                    self.delete(revoked, started)
+
+            while pending:
+                self.collect(pending.popleft(), revoked)
+
+        self.delete(revoked, started)
+
+    @staticmethod
+    def get_queryset(users: List[str], older_than: Union[int, None]) -> QuerySet:
+        queryset = Token.objects.order_by("pk")
+        if users:
+            queryset = queryset.filter(
+                **{f"user__{oac_settings.LOOKUP_FIELD}__in": users}
+            )
+        if older_than:
+            queryset = queryset.filter(
+                issued__lt=timezone.now() - timedelta(seconds=older_than)
+            )
+
+        return queryset
+
+    def collect(self, item: Tuple[int, Future], revoked: List[int]) -> None:
+        pk, future = item
+        error = future.result()
+        if error is None:
+            revoked.append(pk)
+        else:
+            self.failed += 1
+            logger.error("revoking refresh token of token %s failed: %s", pk, error)
+
+    def delete(self, revoked: List[int], started: float) -> None:
+        Token.objects.filter(pk__in=revoked).delete()
+        self.revoked += len(revoked)
+        revoked.clear()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"revoked: {self.revoked}, failed: {self.failed},"
+            f" {self.revoked / elapsed if elapsed else 0:.1f} tokens/s"
+        )
+
+    @staticmethod
+    def revoke(refresh_token: str, service: OAuthRequestService) -> Union[str, None]:
+        try:
+            service.revoke_refresh_token(refresh_token)
+        except (OACError, RequestException) as err:
+            return f"{type(err).__name__}: {err}"
+
+        return None
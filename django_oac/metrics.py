@@ -0,0 +1,170 @@
+import time
+from contextlib import contextmanager
+from functools import wraps
+from threading import Lock, Thread, current_thread, local
+from typing import Callable, Iterator, List, Tuple
+from weakref import ref
+
+from .conf import settings as oac_settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+COUNTER = "counter"
+HISTOGRAM = "histogram"
+
+
+class Metrics:
+    def __init__(
+        self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, hook: Callable = None
+    ) -> None:
+        self.buckets = buckets
+        self.hook = hook or oac_settings.METRICS_HOOK
+        # values go to per thread shards without lock, summed up when collected
+        self._local = local()
+        self._shards: List[Tuple[Callable[[], Thread], Tuple[dict, dict]]] = []
+        self._finished: Tuple[dict, dict] = ({}, {})
+        self._lock = Lock()
+
+    def _get_shard(self) -> Tuple[dict, dict]:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = ({}, {})
+            with self._lock:
+                self._fold_finished()
+                self._shards.append((ref(current_thread()), shard))
+            return shard
+
+    def _fold_finished(self) -> None:
+        # finished threads record nothing more, their shards can be merged
+        shards = []
+        for thread, shard in self._shards:
+            if thread() is not None and thread().is_alive():
+                shards.append((thread, shard))
+            else:
+                self._merge(self._finished, shard)
+        self._shards = shards
+
+    @staticmethod
+    def _merge(total: Tuple[dict, dict], shard: Tuple[dict, dict]) -> None:
+        counters, histograms = total
+        shard_counters, shard_histograms = shard
+        for key, value in dict(shard_counters).items():
+            counters[key] = counters.get(key, 0) + value
+        for key, histogram in dict(shard_histograms).items():
+            total_histogram = histograms.setdefault(key, [0] * len(histogram))
+            for index, value in enumerate(list(histogram)):
+                total_histogram[index] += value
+
+    def incr(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        counters = self._get_shard()[0]
+        counters[key] = counters.get(key, 0) + value
+        if self.hook is not None:
+            self.hook(COUNTER, name, value, labels)
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        histograms = self._get_shard()[1]
+        # bucket counts followed by total count and sum
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = [0] * (len(self.buckets) + 2)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                histogram[index] += 1
+                break
+        histogram[-2] += 1
+        histogram[-1] += value
+        if self.hook is not None:
+            self.hook(HISTOGRAM, name, value, labels)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def timed(self, name: str, **labels) -> Callable:
+        def decorator(func: Callable) -> Callable:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def collect(self) -> Tuple[dict, dict]:
+        total = ({}, {})
+        with self._lock:
+            self._fold_finished()
+            self._merge(total, self._finished)
+            shards = [shard for _, shard in self._shards]
+
+        for shard in shards:
+            self._merge(total, shard)
+
+        return total
+
+    def clear(self) -> None:
+        with self._lock:
+            for counters, histograms in [
+                self._finished,
+                *(shard for _, shard in self._shards),
+            ]:
+                counters.clear()
+                histograms.clear()
+
+
+def _format_labels(labels: tuple, **extra) -> str:
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ""
+
+    return "{%s}" % ",".join(
+        '%s="%s"' % (key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for key, value in pairs
+    )
+
+
+def export_prometheus(registry: Metrics = None) -> str:
+    registry = registry or metrics
+    counters, histograms = registry.collect()
+    prefix = __package__
+
+    lines = []
+    for name in sorted({name for name, _ in counters}):
+        lines.append(f"# TYPE {prefix}_{name}_total counter")
+        for (key_name, labels), value in sorted(counters.items()):
+            if key_name == name:
+                lines.append(f"{prefix}_{name}_total{_format_labels(labels)} {value}")
+
+    for name in sorted({name for name, _ in histograms}):
+        lines.append(f"# TYPE {prefix}_{name} histogram")
+        for (key_name, labels), histogram in sorted(histograms.items()):
+            if key_name != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(registry.buckets, histogram):
+                cumulative += count
+                lines.append(
+                    f"{prefix}_{name}_bucket{_format_labels(labels, le=bound)}"
+                    f" {cumulative}"
+                )
+            lines.append(
+                f"{prefix}_{name}_bucket{_format_labels(labels, le='+Inf')}"
+                f" {histogram[-2]}"
+            )
+            lines.append(
+                f"{prefix}_{name}_count{_format_labels(labels)} {histogram[-2]}"
+            )
+            lines.append(f"{prefix}_{name}_sum{_format_labels(labels)} {histogram[-1]}")
+
+    return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
@@ -1,16 +1,56 @@
-from logging import Logger
-from typing import Callable, Type
+import re
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextvars import copy_context
+from hashlib import sha256
+from json.decoder import JSONDecodeError
+from logging import Logger, getLogger
+from typing import Callable, Tuple, Type, Union
 
-from django.contrib.auth import logout
+from django.conf import settings
+from django.contrib.auth import get_user_model, logout
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
 from django.http.request import HttpRequest
 from django.http.response import HttpResponseBase
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from jwcrypto.common import JWException
+from jwt.exceptions import PyJWTError
+from requests.exceptions import RequestException
 
+from .caches import LRUCache
 from .conf import settings as oac_settings
+from .deadline import deadline
 from .decorators import populate_method_logger as populate_logger
-from .exceptions import ProviderResponseError
+from .exceptions import (
+    InactiveTokenError,
+    NoUserError,
+    OACError,
+    ProviderRequestError,
+    ProviderResponseError,
+)
+from .logger import get_extra
+from .metrics import metrics
+from .models import Token
 from .models_providers.token_provider import TokenProviderBase
+from .models_providers.user_provider import UserProviderBase
+from .server_timing import add_header, collect_timings, timing
+from .services import OAuthIntrospectionService, OAuthIntrospectionServiceBase
 
+logger = getLogger(__package__)
 TokenProvider = oac_settings.TOKEN_PROVIDER_CLASS
+UserModel = get_user_model()
+UserProvider = oac_settings.USER_PROVIDER_CLASS
+
+
+def compile_exempt_paths(patterns: tuple) -> Callable:
+    if not patterns:
+        return lambda path: False
+
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns)).match
 
 
 class OAuthClientMiddleware:
@@ -18,33 +58,335 @@ class OAuthClientMiddleware:
         self,
         get_response: Callable,
         token_provider: TokenProviderBase = TokenProvider(),
+        executor: Executor = None,
     ) -> None:
         self.get_response = get_response
         self.token_provider = token_provider
+        self.exempt_methods = frozenset(
+            method.upper() for method in oac_settings.MIDDLEWARE_EXEMPT_METHODS
+        )
+        self.is_exempt_path = compile_exempt_paths(
+            tuple(oac_settings.MIDDLEWARE_EXEMPT_PATHS)
+        )
+        self.lazy_token = oac_settings.MIDDLEWARE_LAZY_TOKEN
+        self.check_interval = oac_settings.TOKEN_CHECK_INTERVAL
+        self.grace_period = oac_settings.REFRESH_GRACE_PERIOD
+        self.request_deadline = oac_settings.REQUEST_DEADLINE
+        self.server_timing = oac_settings.SERVER_TIMING
+        if executor is None and self.grace_period is not None:
+            executor = ThreadPoolExecutor(
+                max_workers=oac_settings.REFRESH_MAX_WORKERS,
+                thread_name_prefix=__package__,
+            )
+        self.executor = executor
+
+    def __call__(self, request: HttpRequest) -> Type[HttpResponseBase]:
+        if not self.server_timing:
+            return self.process(request)
+
+        with collect_timings() as timings:
+            response = self.process(request)
+        add_header(response, timings)
+
+        return response
+
+    def process(self, request: HttpRequest) -> Type[HttpResponseBase]:
+        with metrics.timer(
+            "middleware_duration_seconds", middleware="OAuthClientMiddleware"
+        ):
+            if request.method in self.exempt_methods or self.is_exempt_path(
+                request.path_info
+            ):
+                request.oac_token = None
+            elif self.lazy_token or self.has_recent_check(request):
+                request.oac_token = SimpleLazyObject(lambda: self.check_token(request))
+            else:
+                request.oac_token = self.check_token(request)
+
+        response = self.get_response(request)
+
+        return response
+
+    def has_recent_check(self, request: HttpRequest) -> bool:
+        if self.check_interval is None:
+            return False
+
+        checked_at, expires_at = request.session.get("OAC_TOKEN_CHECK", (0, 0))
+        now = time.time()
+
+        return (
+            now - checked_at < self.check_interval
+            and expires_at - now > self.check_interval
+        )
+
+    def save_check(self, request: HttpRequest, token: Token) -> None:
+        if self.check_interval is not None:
+            request.session["OAC_TOKEN_CHECK"] = (
+                time.time(),
+                token.expires_at.timestamp(),
+            )
+
+    def is_within_grace_period(self, token: Token) -> bool:
+        return self.grace_period is not None and timezone.now() < (
+            token.expires_at.add(seconds=self.grace_period)
+        )
+
+    def refresh(self, token: Token, logger: Logger) -> None:
+        started = time.monotonic()
+        try:
+            with deadline(self.request_deadline):
+                self.token_provider.refresh(token)
+        except ProviderResponseError as err:
+            logger.error(
+                "raised ProviderResponseError: %s",
+                err,
+                extra={
+                    "event": "token_refresh_failed",
+                    "duration": time.monotonic() - started,
+                },
+            )
+            metrics.incr("token_refreshes", mode="background", outcome="rejected")
+            token.delete()
+            # session cannot be ended from here, next request of the user does it
+            cache.set(
+                f"{__package__}:rejected:{token.user_id}",
+                True,
+                settings.SESSION_COOKIE_AGE,
+            )
+        except (ProviderRequestError, RequestException) as err:
+            logger.error(
+                "raised %s.%s: %s",
+                err.__class__.__module__,
+                err.__class__.__name__,
+                err,
+                extra={
+                    "event": "token_refresh_failed",
+                    "duration": time.monotonic() - started,
+                },
+            )
+            metrics.incr("token_refreshes", mode="background", outcome="failed")
+        else:
+            metrics.incr("token_refreshes", mode="background", outcome="refreshed")
+            logger.info(
+                "access token for user '%s' has been refreshed",
+                token.user.email,
+                extra={
+                    "event": "token_refreshed",
+                    "duration": time.monotonic() - started,
+                },
+            )
+        finally:
+            cache.delete(f"{__package__}:refresh:{token.pk}")
+            connections.close_all()
 
     @populate_logger
-    def __call__(self, request: HttpRequest, logger: Logger) -> Type[HttpResponseBase]:
+    def check_token(self, request: HttpRequest, logger: Logger) -> Union[Token, None]:
+        token = None
         user = request.user
         if user.is_authenticated:
-            token = user.token_set.last()
+            with timing("oac-token-lookup"):
+                token = user.token_set.last()
 
-            if token and token.has_expired:
-                logger.info(f"access token for user '{user.email}' has expired")
+            if token and token.has_expired and self.is_within_grace_period(token):
+                logger.info(
+                    "access token for user '%s' has expired,"
+                    " refreshing in background",
+                    user.email,
+                    extra={"event": "token_expired"},
+                )
+                if cache.add(
+                    f"{__package__}:refresh:{token.pk}", True, self.grace_period
+                ):
+                    # run in a copy of the log context of this request
+                    self.executor.submit(
+                        copy_context().run, self.refresh, token, logger
+                    )
+            elif token and token.has_expired:
+                logger.info(
+                    "access token for user '%s' has expired",
+                    user.email,
+                    extra={"event": "token_expired"},
+                )
+                started = time.monotonic()
                 try:
-                    self.token_provider.refresh(token)
+                    with deadline(self.request_deadline), timing("oac-refresh"):
+                        self.token_provider.refresh(token)
                 except ProviderResponseError as err:
-                    logger.error(f"raised ProviderResponseError: {err}")
+                    logger.error(
+                        "raised ProviderResponseError: %s",
+                        err,
+                        extra={
+                            "event": "token_refresh_failed",
+                            "duration": time.monotonic() - started,
+                        },
+                    )
+                    metrics.incr("token_refreshes", mode="inline", outcome="rejected")
                     token.delete()
+                    token = None
                     logout(request)
+                except (ProviderRequestError, RequestException) as err:
+                    # provider is unreachable, keep session and expired token
+                    logger.error(
+                        "raised %s.%s: %s",
+                        err.__class__.__module__,
+                        err.__class__.__name__,
+                        err,
+                        extra={
+                            "event": "token_refresh_failed",
+                            "duration": time.monotonic() - started,
+                        },
+                    )
+                    metrics.incr("token_refreshes", mode="inline", outcome="failed")
                 else:
+                    metrics.incr("token_refreshes", mode="inline", outcome="refreshed")
                     logger.info(
-                        f"access token for user '{user.email}' has been refreshed"
+                        "access token for user '%s' has been refreshed",
+                        user.email,
+                        extra={
+                            "event": "token_refreshed",
+                            "duration": time.monotonic() - started,
+                        },
                     )
+                    self.save_check(request, token)
+            elif not token and cache.get(f"{__package__}:rejected:{user.pk}"):
+                logger.info(
+                    "refresh token of user '%s' has been rejected, logging out",
+                    user.email,
+                    extra={"event": "token_rejected"},
+                )
+                cache.delete(f"{__package__}:rejected:{user.pk}")
+                logout(request)
             elif not token:
-                logger.info(f"no access token found for user '{user.email}'")
+                logger.info(
+                    "no access token found for user '%s'",
+                    user.email,
+                    extra={"event": "token_missing"},
+                )
             else:
-                logger.debug(f"access token for user '{user.email}' is valid")
+                logger.debug(
+                    "access token for user '%s' is valid",
+                    user.email,
+                    extra={"event": "token_valid"},
+                )
+                self.save_check(request, token)
+
+        return token
+
+
+class OAuthBearerMiddleware:
+    def __init__(
+        self,
+        get_response: Callable,
+        user_provider: UserProviderBase = UserProvider(),
+        introspection_service: OAuthIntrospectionServiceBase = (
+            OAuthIntrospectionService()
+        ),
+    ) -> None:
+        self.get_response = get_response
+        self.user_provider = user_provider
+        self.introspection_service = introspection_service
+        self.introspect = oac_settings.INTROSPECT_URI is not None
+        self.audience = oac_settings.BEARER_AUDIENCE or oac_settings.CLIENT_ID
+        self.lookup_field = oac_settings.LOOKUP_FIELD
+        self.verified_tokens = LRUCache(oac_settings.BEARER_CACHE_SIZE)
+        self.rejected_tokens = LRUCache(oac_settings.BEARER_CACHE_SIZE)
+
+    def __call__(self, request: HttpRequest) -> Type[HttpResponseBase]:
+        authorization = request.META.get("HTTP_AUTHORIZATION", "")
+        if authorization[:7].lower() == "bearer ":
+            try:
+                with metrics.timer(
+                    "middleware_duration_seconds", middleware="OAuthBearerMiddleware"
+                ):
+                    user_pk = self.authenticate(authorization[7:].strip())
+            except (
+                JSONDecodeError,
+                JWException,
+                OACError,
+                PyJWTError,
+                RequestException,
+                TypeError,
+                ValueError,
+            ) as err:
+                logger.info(
+                    "bearer token rejected, raised %s.%s: %s",
+                    err.__class__.__module__,
+                    err.__class__.__name__,
+                    err,
+                    extra={
+                        **get_extra("middleware.OAuthBearerMiddleware"),
+                        "event": "bearer_rejected",
+                    },
+                )
+                response = HttpResponse(status=401)
+                response["WWW-Authenticate"] = 'Bearer error="invalid_token"'
+                return response
+
+            request.user = SimpleLazyObject(
+                lambda: UserModel.objects.filter(pk=user_pk).first() or AnonymousUser()
+            )
 
         response = self.get_response(request)
 
         return response
+
+    def authenticate(self, bearer_token: str) -> str:
+        cache_key = sha256(bearer_token.encode("utf-8")).hexdigest()
+
+        user_pk = self.verified_tokens.get(cache_key)
+        metrics.incr(
+            "cache_requests",
+            cache="bearer",
+            result="miss" if user_pk is None else "hit",
+        )
+        if user_pk is None:
+            if self.rejected_tokens.get(cache_key):
+                raise InactiveTokenError("bearer token has been rejected recently")
+
+            try:
+                user_pk, expires_at = self.verify(bearer_token)
+            except (
+                JSONDecodeError,
+                ProviderRequestError,
+                ProviderResponseError,
+                RequestException,
+            ):
+                # provider failures say nothing about the token itself
+                raise
+            except (JWException, OACError, PyJWTError, TypeError, ValueError):
+                self.rejected_tokens.set(
+                    cache_key,
+                    True,
+                    time.time() + oac_settings.BEARER_REJECTION_CACHE_TIMEOUT,
+                )
+                raise
+
+            if expires_at is not None:
+                self.verified_tokens.set(cache_key, user_pk, expires_at)
+
+        return user_pk
+
+    def verify(self, bearer_token: str) -> Tuple[int, Union[float, None]]:
+        # opaque tokens cannot be verified locally
+        if self.introspect and bearer_token.count(".") != 2:
+            data = self.introspection_service.introspect(bearer_token)
+            if not data.get("active"):
+                raise InactiveTokenError("bearer token is not active")
+            data["exp"] = min(
+                data.get("exp", float("inf")),
+                time.time() + oac_settings.INTROSPECTION_CACHE_TIMEOUT,
+            )
+        else:
+            data = self.user_provider.decode_id_token(
+                bearer_token, audience=self.audience
+            )
+
+        user_pk = (
+            UserModel.objects.filter(**{self.lookup_field: data.get(self.lookup_field)})
+            .values_list("pk", flat=True)
+            .first()
+        )
+        if user_pk is None:
+            raise NoUserError("no user matching bearer token")
+
+        return user_pk, data.get("exp")
@@ -24,8 +24,22 @@ class Token(models.Model):
 
         return f"issued on {self.issued} for {username}"
 
+    @property
+    def expires_at(self) -> pendulum.DateTime:
+        return pendulum.instance(self.issued).add(seconds=self.expires_in)
+
     @property
     def has_expired(self) -> bool:
-        return timezone.now() >= pendulum.instance(self.issued).add(
-            seconds=self.expires_in
-        )
+        return timezone.now() >= self.expires_at
+
+
+class PendingRevocation(models.Model):
+
+    refresh_token = models.TextField()
+    created = models.DateTimeField(default=timezone.now, editable=False)
+    attempts = models.PositiveIntegerField(default=0, editable=False)
+    next_attempt = models.DateTimeField(db_index=True, default=timezone.now)
+    last_error = models.TextField(blank=True, editable=False)
+
+    def __str__(self) -> str:
+        return f"queued on {self.created}, attempts: {self.attempts}"
@@ -1,3 +1,4 @@
+import time
 from abc import ABC, abstractmethod
 from logging import getLogger
 
@@ -8,7 +9,17 @@ from ..conf import settings as oac_settings
 from ..exceptions import NoUserError
 from ..models import Token
 from ..models_providers.user_provider import UserProviderBase
+from ..server_timing import timing
 from ..services import OAuthRequestService, OAuthRequestServiceBase
+from ..signals import (
+    get_outcome,
+    send,
+    token_issued,
+    token_refresh_failed,
+    token_refreshed,
+    token_revoked,
+)
+from ..tracing import traced
 
 logger = getLogger(__package__)
 UserModel = get_user_model()
@@ -41,14 +52,20 @@ class DefaultTokenProvider(TokenProviderBase):
     ):
         self._oauth_request_service = oauth_request_service
 
+    @traced("django_oac.DefaultTokenProvider.create")
     def create(
         self, code: str, user_provider: UserProviderBase = UserProvider()
     ) -> Token:
-        data = self._oauth_request_service.get_access_token(code)
+        started = time.perf_counter()
+        with timing("oac-token-exchange"):
+            data = self._oauth_request_service.get_access_token(code)
+        elapsed = time.perf_counter() - started
 
         id_token = data.pop("id_token", "")
 
-        user, created = user_provider.get_or_create(id_token)
+        user, created = user_provider.get_or_create(
+            id_token, access_token=data.get("access_token")
+        )
 
         if not user:
             raise NoUserError("user provider returned no user")
@@ -56,18 +73,78 @@ class DefaultTokenProvider(TokenProviderBase):
         if not created and user.token_set.exists():
             user.token_set.all().delete()
 
-        return Token.objects.create(issued=timezone.now(), user=user, **data)
-
+        # other fields of response, ie. token_type, are not stored
+        token = Token.objects.create(
+            access_token=data["access_token"],
+            refresh_token=data["refresh_token"],
+            expires_in=data["expires_in"],
+            issued=timezone.now(),
+            user=user,
+        )
+        send(
+            token_issued,
+            self.__class__,
+            token=token,
+            user=user,
+            elapsed=elapsed,
+            outcome=get_outcome(),
+        )
+
+        return token
+
+    @traced("django_oac.DefaultTokenProvider.refresh")
     def refresh(self, instance: Token) -> None:
-        data = self._oauth_request_service.refresh_access_token(instance.refresh_token)
+        started = time.perf_counter()
+        try:
+            data = self._oauth_request_service.refresh_access_token(
+                instance.refresh_token
+            )
+        except Exception as err:
+            send(
+                token_refresh_failed,
+                self.__class__,
+                token=instance,
+                error=err,
+                elapsed=time.perf_counter() - started,
+                outcome=get_outcome(err),
+            )
+            raise
+        elapsed = time.perf_counter() - started
 
         instance.access_token = data.get("access_token", instance.access_token)
         instance.refresh_token = data.get("refresh_token", instance.refresh_token)
         instance.expires_in = data.get("expires_in", instance.expires_in)
         instance.issued = timezone.now()
         instance.save()
+        send(
+            token_refreshed,
+            self.__class__,
+            token=instance,
+            elapsed=elapsed,
+            outcome=get_outcome(),
+        )
 
     def revoke(self, instance: Token) -> None:
-        self._oauth_request_service.revoke_refresh_token(instance.refresh_token)
+        started = time.perf_counter()
+        try:
+            self._oauth_request_service.revoke_refresh_token(instance.refresh_token)
+        except Exception as err:
+            send(
+                token_revoked,
+                self.__class__,
+                token=instance,
+                error=err,
+                elapsed=time.perf_counter() - started,
+                outcome=get_outcome(err),
+            )
+            raise
+        send(
+            token_revoked,
+            self.__class__,
+            token=instance,
+            error=None,
+            elapsed=time.perf_counter() - started,
+            outcome=get_outcome(),
+        )
 
         instance.delete()
@@ -1,17 +1,30 @@
+import time
 from abc import ABC, abstractmethod
+from hashlib import sha1
 from logging import getLogger
 from typing import List, Tuple, Union
 from uuid import uuid4
 
 import jwt
 from django.contrib.auth import get_user_model
-from jwt.exceptions import InvalidSignatureError
+from django.core.cache import cache
+from jwt.exceptions import InvalidKeyError, InvalidSignatureError
 
 from ..conf import settings as oac_settings
-from ..exceptions import InsufficientPayloadError
+from ..deadline import check_deadline
+from ..exceptions import InsufficientPayloadError, ProviderResponseError
 from ..helpers import get_missing_keys
 from ..logger import get_extra
-from ..services import CacheJWKSService, JWKSServiceBase, OAuthJWKSService
+from ..server_timing import timed, timing
+from ..services import (
+    CacheJWKSService,
+    JWKSServiceBase,
+    OAuthJWKSService,
+    OAuthUserInfoService,
+    OAuthUserInfoServiceBase,
+)
+from ..signals import get_outcome, send, user_created
+from ..tracing import traced
 
 logger = getLogger(__package__)
 UserModel = get_user_model()
@@ -27,6 +40,8 @@ class UserProviderBase(ABC):
 
 class DefaultUserProvider(UserProviderBase):
     @staticmethod
+    @traced("django_oac.UserProvider.fetch_jwks_from_services")
+    @timed("oac-jwks")
     def fetch_jwks_from_services(
         kid: str,
         slice_starting_index: int = 0,
@@ -48,31 +63,44 @@ class DefaultUserProvider(UserProviderBase):
         jwks_service = jwks_service or CacheJWKSService()
         jwks_service.save(jwks)
 
+    @traced("django_oac.UserProvider.decode_id_token")
     def decode_id_token(self, id_token: str, **kwargs):
         kid = jwt.get_unverified_header(id_token).get("kid", None)
+        unknown_kid_key = (
+            f"{__package__}:unknown_kid:{sha1(str(kid).encode('utf-8')).hexdigest()}"
+        )
+        if cache.get(unknown_kid_key):
+            raise InvalidKeyError(f"no JSON Web Key with key id '{kid}'")
 
         jwk, jwks, from_cache = self.fetch_jwks_from_services(
             kid, jwks_services=kwargs.get("fetch_from_services")
         )
+        if jwk is None:
+            cache.set(unknown_kid_key, True, oac_settings.JWKS_REFETCH_INTERVAL)
+            raise InvalidKeyError(f"no JSON Web Key with key id '{kid}'")
 
         jwt_decode_kwargs = {
-            "audience": oac_settings.CLIENT_ID,
+            "audience": kwargs.get("audience") or oac_settings.CLIENT_ID,
             "key": jwt.algorithms.RSAAlgorithm.from_jwk(jwk),
             "algorithms": ["RS256"],
             "leeway": 30,
         }
 
         try:
-            data = jwt.decode(id_token, **jwt_decode_kwargs)
+            with timing("oac-jwt"):
+                data = jwt.decode(id_token, **jwt_decode_kwargs)
         except InvalidSignatureError as e_info:
             if from_cache:
                 jwk, jwks, _ = self.fetch_jwks_from_services(
                     kid, 1, kwargs.get("fetch_from_services")
                 )
+                if jwk is None:
+                    raise InvalidSignatureError from e_info
                 jwt_decode_kwargs.update(
                     {"key": jwt.algorithms.RSAAlgorithm.from_jwk(jwk)}
                 )
-                data = jwt.decode(id_token, **jwt_decode_kwargs)
+                with timing("oac-jwt"):
+                    data = jwt.decode(id_token, **jwt_decode_kwargs)
                 self.save_jwks_by_service(jwks, kwargs.get("save_by_service"))
             else:
                 raise InvalidSignatureError from e_info
@@ -82,36 +110,80 @@ class DefaultUserProvider(UserProviderBase):
 
         return data
 
+    @staticmethod
+    def fetch_user_info(
+        data: dict,
+        lookup_field: str,
+        userinfo_service: OAuthUserInfoServiceBase = None,
+        **kwargs,
+    ) -> dict:
+        userinfo_service = userinfo_service or OAuthUserInfoService()
+
+        # claims are cached per subject, lookup value may be shared or reused
+        if not data.get("sub"):
+            raise InsufficientPayloadError("ID Token is missing 'sub' claim")
+
+        user_info = userinfo_service.fetch(kwargs["access_token"], str(data["sub"]))
+        if user_info.get("sub") != data["sub"]:
+            raise ProviderResponseError(
+                "user info subject does not match ID Token subject"
+            )
+
+        return user_info
+
+    @traced("django_oac.DefaultUserProvider.get_or_create")
     def get_or_create(
         self, id_token: str, lookup_field: str = oac_settings.LOOKUP_FIELD, **kwargs
     ) -> Tuple[UserModel, bool]:
+        started = time.perf_counter()
         data = self.decode_id_token(id_token, **kwargs)
 
+        user_info = None
+        if oac_settings.USERINFO_URI and kwargs.get("access_token"):
+            with timing("oac-userinfo"):
+                user_info = self.fetch_user_info(data, lookup_field, **kwargs)
+            data = {**data, **user_info}
+
         missing = get_missing_keys({"first_name", "last_name", "email"}, data.keys())
         if missing:
             raise InsufficientPayloadError(
                 f"payload is missing required data: {missing}"
             )
 
+        elapsed = time.perf_counter() - started
+        check_deadline()
+
         created = False
         lookup_value = data.get(lookup_field)
 
         try:
-            instance = UserModel.objects.get(**{lookup_field: lookup_value})
+            with timing("oac-user-lookup"):
+                instance = UserModel.objects.get(**{lookup_field: lookup_value})
         except UserModel.DoesNotExist:
-            instance = UserModel.objects.create(
-                first_name=data.get("first_name", ""),
-                last_name=data.get("last_name", ""),
-                email=data.get("email"),
-                username=data.get("username", uuid4().hex),
-            )
+            with timing("oac-user-lookup"):
+                instance = UserModel.objects.create(
+                    first_name=data.get("first_name", ""),
+                    last_name=data.get("last_name", ""),
+                    email=data.get("email"),
+                    username=data.get("username", uuid4().hex),
+                )
             created = True
+            send(
+                user_created,
+                self.__class__,
+                user=instance,
+                claims=data,
+                elapsed=elapsed,
+                outcome=get_outcome(),
+            )
             logger.info(
                 "created new user '%s'",
                 lookup_value,
                 extra=get_extra(f"{__package__}.{self.__class__.__name__}"),
             )
         else:
+            if user_info:
+                self.update_user(instance, data)
             logger.info(
                 "got existing user '%s'",
                 lookup_value,
@@ -119,3 +191,16 @@ class DefaultUserProvider(UserProviderBase):
             )
 
         return instance, created
+
+    @staticmethod
+    def update_user(instance: UserModel, data: dict) -> None:
+        changed = [
+            field
+            for field in ("first_name", "last_name", "email")
+            if getattr(instance, field) != data[field]
+        ]
+        if changed:
+            for field in changed:
+                setattr(instance, field, data[field])
+            with timing("oac-user-lookup"):
+                instance.save(update_fields=changed)
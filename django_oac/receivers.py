@@ -0,0 +1,12 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .helpers import bump_profile_version
+
+UserModel = get_user_model()
+
+
+@receiver(post_save, sender=UserModel)
+def user_post_save(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    bump_profile_version(instance.pk)
@@ -0,0 +1,116 @@
+import time
+
+from django.core.cache import cache
+
+from .conf import settings as oac_settings
+from .deadline import get_remaining
+from .exceptions import CircuitOpenError, RateLimitExceededError
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BACKGROUND = "background"
+PRIORITY_REVOCATION = "revocation"
+
+# share of per second limit available for requests of given priority
+PRIORITY_SHARES = {
+    PRIORITY_INTERACTIVE: 1.0,
+    PRIORITY_BACKGROUND: 0.8,
+    PRIORITY_REVOCATION: 0.5,
+}
+
+
+class CircuitBreaker:
+
+    __slots__ = ("endpoint", "_failures_key", "_opened_key", "_trial_key")
+
+    def __init__(self, endpoint: str) -> None:
+        self.endpoint = endpoint
+        self._failures_key = f"{__package__}:circuit:{endpoint}:failures"
+        self._opened_key = f"{__package__}:circuit:{endpoint}:opened"
+        self._trial_key = f"{__package__}:circuit:{endpoint}:trial"
+
+    def allow(self) -> None:
+        opened_until = cache.get(self._opened_key)
+        if opened_until is None:
+            return
+
+        # after reset timeout single trial request is let through
+        if time.time() < opened_until or not cache.add(
+            self._trial_key, True, oac_settings.CIRCUIT_BREAKER_RESET_TIMEOUT
+        ):
+            raise CircuitOpenError(
+                f"circuit for {self.endpoint} endpoint is open, request not sent"
+            )
+
+    def record_success(self) -> None:
+        cache.delete_many([self._failures_key, self._opened_key, self._trial_key])
+
+    def record_failure(self) -> None:
+        if cache.get(self._opened_key) is not None:
+            self.open()
+            return
+
+        if cache.add(self._failures_key, 1, oac_settings.CIRCUIT_BREAKER_RESET_TIMEOUT):
+            failures = 1
+        else:
+            try:
+                failures = cache.incr(self._failures_key)
+            except ValueError:
+                failures = 1
+
+        if failures >= oac_settings.CIRCUIT_BREAKER_THRESHOLD:
+            self.open()
+
+    def open(self) -> None:
+        cache.set(
+            self._opened_key,
+            time.time() + oac_settings.CIRCUIT_BREAKER_RESET_TIMEOUT,
+            None,
+        )
+        cache.delete_many([self._failures_key, self._trial_key])
+
+
+class RateLimiter:
+
+    __slots__ = ("rate", "max_wait")
+
+    def __init__(self, rate: int = None, max_wait: float = None) -> None:
+        self.rate = rate or oac_settings.RATE_LIMIT
+        self.max_wait = max_wait or oac_settings.RATE_LIMIT_MAX_WAIT
+
+    def acquire(self, priority: str = PRIORITY_INTERACTIVE) -> None:
+        if self.rate is None:
+            return
+
+        limit = max(int(self.rate * PRIORITY_SHARES[priority]), 1)
+        max_wait = self.max_wait
+        remaining = get_remaining()
+        if remaining is not None:
+            max_wait = min(max_wait, remaining)
+        wait_until = time.monotonic() + max_wait
+
+        while True:
+            # counter of requests sent by all processes within current second
+            window = int(time.time())
+            cache_key = f"{__package__}:ratelimit:{window}"
+            if cache.add(cache_key, 1, 2):
+                count = 1
+            else:
+                try:
+                    count = cache.incr(cache_key)
+                except ValueError:
+                    count = 1
+
+            if count <= limit:
+                return
+
+            try:
+                cache.decr(cache_key)
+            except ValueError:
+                pass
+
+            delay = window + 1 - time.time()
+            if time.monotonic() + delay > wait_until:
+                raise RateLimitExceededError(
+                    f"rate limit exceeded, {priority} request not sent"
+                )
+            time.sleep(delay)
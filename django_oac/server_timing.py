@@ -0,0 +1,95 @@
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Iterator, Union
+
+from django.http import HttpResponse
+from django.http.request import HttpRequest
+
+from .conf import settings as oac_settings
+
+_timings: ContextVar[Union[dict, None]] = ContextVar(
+    f"{__package__}.server_timing", default=None
+)
+
+NOOP_TIMER = nullcontext()
+
+
+class Timer:
+    __slots__ = ("name", "timings", "started")
+
+    def __init__(self, name: str, timings: dict) -> None:
+        self.name = name
+        self.timings = timings
+        self.started = None
+
+    def __enter__(self) -> "Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        self.timings[self.name] = (
+            self.timings.get(self.name, 0) + time.perf_counter() - self.started
+        )
+        return False
+
+
+def timing(name: str):
+    timings = _timings.get()
+
+    return NOOP_TIMER if timings is None else Timer(name, timings)
+
+
+def timed(name: str) -> Callable:
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timing(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def collect_timings() -> Iterator[Union[dict, None]]:
+    # nested collectors report to the outermost one
+    if _timings.get() is not None:
+        yield None
+        return
+
+    timings = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def add_header(response: HttpResponse, timings: Union[dict, None]) -> None:
+    if not timings:
+        return
+
+    value = ", ".join(
+        f"{name};dur={duration * 1000:.1f}" for name, duration in timings.items()
+    )
+    if response.has_header("Server-Timing"):
+        value = f"{response['Server-Timing']}, {value}"
+    response["Server-Timing"] = value
+
+
+def server_timing(func: Callable) -> Callable:
+    @wraps(func)
+    def wrapper_server_timing(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        if not oac_settings.SERVER_TIMING:
+            return func(request, *args, **kwargs)
+
+        with collect_timings() as timings:
+            response = func(request, *args, **kwargs)
+        add_header(response, timings)
+
+        return response
+
+    return wrapper_server_timing
@@ -1,16 +1,159 @@
+import random
+import time
 from abc import ABC, abstractmethod
-from hashlib import sha1
-from typing import Tuple
+from email.utils import parsedate_to_datetime
+from hashlib import sha1, sha256
+from logging import getLogger
+from typing import Tuple, Union
 
 import requests
 from django.core.cache import cache
 from jwcrypto.jwk import JWKSet
+from requests.exceptions import RequestException
 
+from .caches import coalesce
 from .conf import settings as oac_settings
-from .exceptions import ProviderResponseError
+from .deadline import get_remaining, get_timeout
+from .exceptions import ProviderResponseError, ProviderUnavailableError
 from .helpers import get_missing_keys
+from .logger import get_extra
+from .metrics import metrics
+from .resilience import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_REVOCATION,
+    CircuitBreaker,
+    RateLimiter,
+)
+from .tracing import span
 
 CACHE_KEY = sha1(oac_settings.JWKS_URI.encode("utf-8")).hexdigest()
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+# provider refused to handle the request, unlike gateway errors
+UNAVAILABLE_STATUS_CODES = (429, 503)
+
+logger = getLogger(__package__)
+
+
+def get_retry_after(response: requests.Response) -> Union[float, None]:
+    retry_after = response.headers.get("Retry-After")
+    if not retry_after:
+        return None
+
+    try:
+        return max(float(retry_after), 0)
+    except ValueError:
+        pass
+
+    try:
+        return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def wait_before_retry(endpoint: str, attempt: int, delay: float = None) -> bool:
+    if attempt >= oac_settings.RETRY_MAX_ATTEMPTS:
+        return False
+
+    # full jitter, unless provider said when to come back
+    if delay is None:
+        delay = random.uniform(
+            0,
+            min(
+                oac_settings.RETRY_BACKOFF_MAX,
+                oac_settings.RETRY_BACKOFF_BASE * 2 ** (attempt - 1),
+            ),
+        )
+    elif delay > oac_settings.RETRY_BACKOFF_MAX:
+        return False
+
+    remaining = get_remaining()
+    if remaining is not None and delay >= remaining:
+        return False
+
+    metrics.incr("provider_retries", endpoint=endpoint)
+    logger.info(
+        "retrying %s request, attempt %d of %d in %.2f s",
+        endpoint,
+        attempt + 1,
+        oac_settings.RETRY_MAX_ATTEMPTS,
+        delay,
+        extra={**get_extra("services.send_request"), "event": "request_retry"},
+    )
+    time.sleep(delay)
+
+    return True
+
+
+def send_request(
+    method: str,
+    endpoint: str,
+    url: str,
+    session: requests.Session = None,
+    idempotent: bool = False,
+    priority: str = PRIORITY_INTERACTIVE,
+    retry_unavailable: bool = False,
+    **kwargs,
+) -> requests.Response:
+    # responses with RETRY_STATUS_CODES are retried for idempotent requests,
+    # ones with UNAVAILABLE_STATUS_CODES also for requests marked with
+    # retry_unavailable, connection errors only for idempotent ones
+    if idempotent:
+        retry_status_codes = RETRY_STATUS_CODES
+    elif retry_unavailable:
+        retry_status_codes = UNAVAILABLE_STATUS_CODES
+    else:
+        retry_status_codes = ()
+    circuit_breaker = CircuitBreaker(endpoint)
+    rate_limiter = RateLimiter()
+    attempt = 0
+
+    while True:
+        attempt += 1
+        circuit_breaker.allow()
+        rate_limiter.acquire(priority)
+
+        started = time.perf_counter()
+        try:
+            with span(
+                f"{method.upper()} {endpoint}",
+                {
+                    "http.method": method.upper(),
+                    "http.url": url,
+                    "oac.endpoint": endpoint,
+                    "oac.attempt": attempt,
+                },
+            ) as current_span:
+                response = getattr(session or requests, method)(
+                    url, timeout=get_timeout(endpoint), **kwargs
+                )
+                current_span.set_attribute("http.status_code", response.status_code)
+        except RequestException:
+            metrics.incr("provider_requests", endpoint=endpoint, status="error")
+            circuit_breaker.record_failure()
+            if idempotent and wait_before_retry(endpoint, attempt):
+                continue
+            raise
+
+        metrics.observe(
+            "provider_request_duration_seconds",
+            time.perf_counter() - started,
+            endpoint=endpoint,
+        )
+        metrics.incr(
+            "provider_requests", endpoint=endpoint, status=response.status_code
+        )
+
+        if response.status_code >= 500:
+            circuit_breaker.record_failure()
+        else:
+            circuit_breaker.record_success()
+
+        if not (
+            response.status_code in retry_status_codes
+            and wait_before_retry(endpoint, attempt, get_retry_after(response))
+        ):
+            return response
 
 
 class OAuthRequestServiceBase(ABC):
@@ -41,6 +184,7 @@ class OAuthRequestServiceBase(ABC):
 
 class OAuthRequestService(OAuthRequestServiceBase):
     @staticmethod
+    @metrics.timed("provider_call_duration_seconds", call="get_access_token")
     def get_access_token(
         code: str,
         client_id: str = oac_settings.CLIENT_ID,
@@ -56,7 +200,7 @@ class OAuthRequestService(OAuthRequestServiceBase):
             "redirect_uri": redirect_uri,
         }
 
-        response = requests.post(token_uri, payload)
+        response = send_request("post", "token", token_uri, data=payload)
 
         if response.status_code != 200:
             raise ProviderResponseError(
@@ -81,6 +225,7 @@ class OAuthRequestService(OAuthRequestServiceBase):
         return json_dict
 
     @staticmethod
+    @metrics.timed("provider_call_duration_seconds", call="refresh_access_token")
     def refresh_access_token(
         refresh_token: str,
         client_id: str = oac_settings.CLIENT_ID,
@@ -94,8 +239,21 @@ class OAuthRequestService(OAuthRequestServiceBase):
             "client_secret": client_secret,
         }
 
-        response = requests.post(token_uri, payload)
+        response = send_request(
+            "post",
+            "token",
+            token_uri,
+            priority=PRIORITY_BACKGROUND,
+            retry_unavailable=True,
+            data=payload,
+        )
 
+        # refresh token is kept, failure does not say it has been rejected
+        if response.status_code in RETRY_STATUS_CODES or response.status_code >= 500:
+            raise ProviderUnavailableError(
+                "refresh access token request failed,"
+                f" provider responded with code {response.status_code}",
+            )
         if response.status_code != 200:
             raise ProviderResponseError(
                 "refresh access token request failed,"
@@ -105,6 +263,7 @@ class OAuthRequestService(OAuthRequestServiceBase):
         return response.json()
 
     @staticmethod
+    @metrics.timed("provider_call_duration_seconds", call="revoke_refresh_token")
     def revoke_refresh_token(
         refresh_token: str,
         client_id: str = oac_settings.CLIENT_ID,
@@ -118,8 +277,20 @@ class OAuthRequestService(OAuthRequestServiceBase):
             "client_secret": client_secret,
         }
 
-        response = requests.post(revoke_uri, payload)
+        response = send_request(
+            "post",
+            "revoke",
+            revoke_uri,
+            idempotent=True,
+            priority=PRIORITY_REVOCATION,
+            data=payload,
+        )
 
+        if response.status_code in RETRY_STATUS_CODES or response.status_code >= 500:
+            raise ProviderUnavailableError(
+                "revoke refresh token request failed,"
+                f" provider responded with code {response.status_code}",
+            )
         if response.status_code != 200:
             raise ProviderResponseError(
                 "revoke refresh token request failed,"
@@ -127,6 +298,148 @@ class OAuthRequestService(OAuthRequestServiceBase):
             )
 
 
+class OAuthIntrospectionServiceBase(ABC):
+
+    __slots__ = ()
+
+    @staticmethod
+    @abstractmethod
+    def introspect(token: str, **kwargs) -> dict:
+        pass
+
+
+class OAuthIntrospectionService(OAuthIntrospectionServiceBase):
+    @staticmethod
+    def introspect(token: str, **kwargs) -> dict:
+        cache_key = (
+            f"{__package__}:introspection:{sha256(token.encode('utf-8')).hexdigest()}"
+        )
+
+        data = cache.get(cache_key)
+        metrics.incr(
+            "cache_requests",
+            cache="introspection",
+            result="miss" if data is None else "hit",
+        )
+        if data is None:
+            data = coalesce(
+                cache_key,
+                lambda: OAuthIntrospectionService.request(token, cache_key, **kwargs),
+            )
+
+        return data
+
+    @staticmethod
+    def request(token: str, cache_key: str, **kwargs) -> dict:
+        introspect_uri = kwargs.get("introspect_uri") or oac_settings.INTROSPECT_URI
+        payload = {
+            "token": token,
+            "token_type_hint": "access_token",
+            "client_id": kwargs.get("client_id") or oac_settings.CLIENT_ID,
+            "client_secret": kwargs.get("client_secret") or oac_settings.CLIENT_SECRET,
+        }
+
+        response = send_request(
+            "post", "introspect", introspect_uri, idempotent=True, data=payload
+        )
+
+        if response.status_code != 200:
+            raise ProviderResponseError(
+                "token introspection request failed,"
+                f" provider responded with code {response.status_code}"
+            )
+
+        json_dict = response.json()
+
+        # positive result lives no longer than the token itself
+        timeout = oac_settings.INTROSPECTION_CACHE_TIMEOUT
+        expires_in = json_dict.get("exp", time.time() + timeout) - time.time()
+        if json_dict.get("active") and expires_in > 0:
+            timeout = min(timeout, expires_in)
+        else:
+            json_dict = {"active": False}
+
+        cache.set(cache_key, json_dict, timeout)
+
+        return json_dict
+
+
+class OAuthUserInfoServiceBase(ABC):
+
+    __slots__ = ()
+
+    @staticmethod
+    @abstractmethod
+    def fetch(access_token: str, subject: str, **kwargs) -> dict:
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def get(subject: str) -> Union[dict, None]:
+        pass
+
+
+class OAuthUserInfoService(OAuthUserInfoServiceBase):
+
+    session = requests.Session()
+
+    @staticmethod
+    def _get_cache_key(subject: str) -> str:
+        return f"{__package__}:userinfo:{sha1(subject.encode('utf-8')).hexdigest()}"
+
+    @staticmethod
+    def fetch(access_token: str, subject: str, **kwargs) -> dict:
+        userinfo_uri = kwargs.get("userinfo_uri") or oac_settings.USERINFO_URI
+        timeout = oac_settings.USERINFO_CACHE_TIMEOUT
+        cache_key = OAuthUserInfoService._get_cache_key(subject)
+
+        entry = cache.get(cache_key)
+        if entry and entry["fetched"] + timeout > time.time():
+            return entry["claims"]
+
+        headers = {"Authorization": f"Bearer {access_token}"}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+
+        response = send_request(
+            "get",
+            "userinfo",
+            userinfo_uri,
+            session=OAuthUserInfoService.session,
+            idempotent=True,
+            headers=headers,
+        )
+
+        if response.status_code == 304 and entry:
+            claims = entry["claims"]
+        elif response.status_code == 200:
+            claims = response.json()
+        else:
+            raise ProviderResponseError(
+                "user info request failed,"
+                f" provider responded with code {response.status_code}"
+            )
+
+        # stale entry is kept for a while to be revalidated with its ETag
+        cache.set(
+            cache_key,
+            {
+                "claims": claims,
+                "etag": response.headers.get("ETag") or (entry or {}).get("etag"),
+                "fetched": time.time(),
+            },
+            timeout * 2,
+        )
+
+        return claims
+
+    @staticmethod
+    def get(subject: str) -> Union[dict, None]:
+        entry = cache.get(OAuthUserInfoService._get_cache_key(subject))
+
+        return entry["claims"] if entry else None
+
+
 class JWKSServiceBase(ABC):
 
     __slots__ = ()
@@ -135,7 +448,8 @@ class JWKSServiceBase(ABC):
     def get_key(kid: str, jwks_json: str) -> Tuple[str, str]:
         jwk = None
         if jwks_json:
-            jwk = JWKSet.from_json(jwks_json).get_key(kid).export_public()
+            key = JWKSet.from_json(jwks_json).get_key(kid)
+            jwk = key.export_public() if key else None
 
         return jwk, jwks_json
 
@@ -164,9 +478,14 @@ class CacheJWKSService(JWKSServiceBase):
     def fetch(kid: str, **kwargs) -> Tuple[str, str]:
         cache_key = kwargs.get("cache_key") or CACHE_KEY
 
-        return super(CacheJWKSService, CacheJWKSService).get_key(
+        jwk, jwks_json = super(CacheJWKSService, CacheJWKSService).get_key(
             kid, cache.get(cache_key)
         )
+        metrics.incr(
+            "cache_requests", cache="jwks", result="miss" if jwk is None else "hit"
+        )
+
+        return jwk, jwks_json
 
     @staticmethod
     def save(jwks: str, **kwargs) -> None:
@@ -181,10 +500,24 @@ class OAuthJWKSService(JWKSServiceBase):
         raise NotImplementedError("cannot use 'clear' on OAuthJWKSService")
 
     @staticmethod
+    @metrics.timed("provider_call_duration_seconds", call="fetch_jwks")
     def fetch(kid: str, **kwargs) -> Tuple[str, str]:
         jwks_uri = kwargs.get("jwks_uri") or oac_settings.JWKS_URI
+        cache_key = f"{sha1(jwks_uri.encode('utf-8')).hexdigest()}:fetched"
+
+        # key set fetched within refetch interval answers unknown key ids and
+        # forged signatures, so they cannot make every request hit provider
+        jwks_json = cache.get(cache_key)
+        if jwks_json is None:
+            jwks_json = coalesce(
+                cache_key, lambda: OAuthJWKSService.request(jwks_uri, cache_key)
+            )
 
-        response = requests.get(jwks_uri)
+        return super(OAuthJWKSService, OAuthJWKSService).get_key(kid, jwks_json)
+
+    @staticmethod
+    def request(jwks_uri: str, cache_key: str) -> str:
+        response = send_request("get", "jwks", jwks_uri, idempotent=True)
 
         if response.status_code != 200:
             raise ProviderResponseError(
@@ -192,7 +525,9 @@ class OAuthJWKSService(JWKSServiceBase):
                 f" provider responded with code {response.status_code}"
             )
 
-        return super(OAuthJWKSService, OAuthJWKSService).get_key(kid, response.content)
+        cache.set(cache_key, response.content, oac_settings.JWKS_REFETCH_INTERVAL)
+
+        return response.content
 
     @staticmethod
     def save(jwks: str, **kwargs) -> None:
@@ -0,0 +1,37 @@
+from django.dispatch import Signal
+
+from .exceptions import ProviderResponseError
+
+OUTCOME_SUCCESS = "success"
+OUTCOME_REJECTED = "rejected"
+OUTCOME_FAILED = "failed"
+
+# every signal is sent with 'elapsed' (seconds spent waiting for provider)
+# and 'outcome' keyword arguments
+
+# token, user
+token_issued = Signal()
+# token
+token_refreshed = Signal()
+# token, error
+token_refresh_failed = Signal()
+# token, error (None on success)
+token_revoked = Signal()
+# user, claims
+user_created = Signal()
+
+
+def get_outcome(error: Exception = None) -> str:
+    if error is None:
+        return OUTCOME_SUCCESS
+    if isinstance(error, ProviderResponseError):
+        return OUTCOME_REJECTED
+
+    return OUTCOME_FAILED
+
+
+def send(signal: Signal, sender: type, **kwargs) -> None:
+    # plain check of connected receivers, Signal.send makes the same one
+    # before any lookup, keyword arguments are built by callers anyway
+    if signal.receivers:
+        signal.send(sender=sender, **kwargs)
@@ -0,0 +1,56 @@
+from functools import lru_cache, wraps
+from typing import Callable
+
+from .conf import settings as oac_settings
+from .exceptions import ConfigurationError
+
+try:
+    from opentelemetry import trace
+except ImportError:  # pragma: no cover
+    trace = None
+
+
+class NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "NoopSpan":
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+    def set_attribute(self, key: str, value) -> None:
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+
+@lru_cache(maxsize=None)
+def get_tracer():
+    if not oac_settings.TRACING:
+        return None
+    if trace is None:
+        raise ConfigurationError("TRACING setting requires opentelemetry-api package")
+
+    return trace.get_tracer(__package__)
+
+
+def span(name: str, attributes: dict = None):
+    tracer = get_tracer()
+    if tracer is None:
+        return NOOP_SPAN
+
+    return tracer.start_as_current_span(name, attributes=attributes)
+
+
+def traced(name: str) -> Callable:
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
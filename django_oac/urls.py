@@ -9,4 +9,5 @@ urlpatterns = [
     re_path(r"^callback/$", views.callback_view, name="callback"),
     re_path(r"^logout/$", views.logout_view, name="logout"),
     re_path(r"^profile/$", views.profile_view, name="profile"),
+    re_path(r"^metrics/$", views.metrics_view, name="metrics"),
 ]
@@ -1,87 +1,178 @@
+import time
+from datetime import datetime
+from hashlib import sha256
 from json.decoder import JSONDecodeError
-from logging import Logger, LoggerAdapter, getLogger
+from logging import Logger
 from pathlib import Path
+from typing import Union
 from uuid import uuid4
 
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse, JsonResponse
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404, HttpResponse, JsonResponse
 from django.http.request import HttpRequest
 from django.shortcuts import redirect, render
 from django.urls import reverse_lazy
 from django.utils import timezone
-from django.views.decorators.http import require_GET
+from django.views.decorators.http import condition, require_GET
 from ipware import get_client_ip
 from jwcrypto.common import JWException
 from jwt.exceptions import PyJWTError
 from requests.exceptions import RequestException
 
 from .apps import DjangoOACConfig
+from .backends import OAuthClientBackend, UserModel
 from .conf import settings as oac_settings
+from .deadline import deadline
 from .decorators import populate_view_logger as populate_logger
 from .decorators import (
     validate_query_string,
     validate_state_expiration,
     validate_state_matching,
 )
-from .exceptions import ConfigurationError, OACError, ProviderResponseError
-from .logger import get_extra
+from .exceptions import (
+    CodeReplayError,
+    ConfigurationError,
+    OACError,
+    ProviderRequestError,
+    ProviderResponseError,
+)
+from .helpers import get_profile_version, sign_state
+from .logger import context_logger, log_context
+from .metrics import export_prometheus
+from .models import PendingRevocation, Token
+from .server_timing import server_timing
+from .tracing import traced
 
 TEMPLATES_DIR = Path(DjangoOACConfig.name)
+TokenProvider = oac_settings.TOKEN_PROVIDER_CLASS
+
+CODE_PENDING = "pending"
+CODE_FAILED = "failed"
+CODE_FORBIDDEN = "forbidden"
+
+
+def _get_code_owner(request: HttpRequest) -> Union[str, None]:
+    session_key = getattr(request.session, "session_key", None)
+    # state travels in URL next to code, only session binds it to a browser
+    if session_key is None:
+        return None
+    owner = f"{session_key}:{request.GET.get('state')}"
+
+    return sha256(owner.encode("utf-8")).hexdigest()
+
+
+def _authenticate_once(request: HttpRequest, code: str) -> Union[UserModel, None]:
+    cache_key = f"{__package__}:code:{sha256(code.encode('utf-8')).hexdigest()}"
+    # result is shared only with requests of the session and state which
+    # started the exchange, anyone else presenting the same code is refused,
+    # so are requests without session
+    owner = _get_code_owner(request)
+
+    if cache.add(cache_key, (owner, CODE_PENDING), oac_settings.CODE_CACHE_TIMEOUT):
+        try:
+            user = authenticate(request, code=code)
+        except Exception:
+            cache.set(cache_key, (owner, CODE_FAILED), oac_settings.CODE_CACHE_TIMEOUT)
+            raise
+        cache.set(
+            cache_key,
+            (owner, str(user.pk) if user else CODE_FORBIDDEN),
+            oac_settings.CODE_CACHE_TIMEOUT,
+        )
+        return user
+
+    # same code is already being exchanged, wait for the result
+    wait_until = time.monotonic() + oac_settings.CODE_WAIT_TIMEOUT
+    entry_owner, result = cache.get(cache_key, (None, None))
+    while result == CODE_PENDING and time.monotonic() < wait_until:
+        time.sleep(0.1)
+        entry_owner, result = cache.get(cache_key, (None, None))
+
+    if (
+        owner is None
+        or entry_owner != owner
+        or result in (None, CODE_PENDING, CODE_FAILED)
+    ):
+        raise CodeReplayError("authorization code has already been used")
+    if result == CODE_FORBIDDEN:
+        return None
+
+    return OAuthClientBackend.get_user(result)
 
 
 @require_GET
+@traced("django_oac.authenticate_view")
 def authenticate_view(request: HttpRequest) -> HttpResponse:
     state_str = uuid4().hex
     client_ip, _ = get_client_ip(request)
 
-    if request.session.get("OAC_STATE_STR") != "test":
-        request.session["OAC_STATE_STR"] = state_str
-        request.session["OAC_STATE_TIMESTAMP"] = timezone.now().timestamp()
-        request.session["OAC_CLIENT_IP"] = client_ip or "unknown"
-
-    logger = LoggerAdapter(
-        getLogger(__package__),
-        get_extra(
-            "views.authenticate_view",
-            request.session["OAC_CLIENT_IP"],
-            request.session["OAC_STATE_STR"],
-        ),
-    )
-    logger.info("authentication request")
+    if oac_settings.STATELESS_STATE:
+        ip_state = client_ip or "unknown", state_str
+        state = sign_state(state_str, client_ip or "unknown")
+    else:
+        if request.session.get("OAC_STATE_STR") != "test":
+            request.session["OAC_STATE_STR"] = state_str
+            request.session["OAC_STATE_TIMESTAMP"] = timezone.now().timestamp()
+            request.session["OAC_CLIENT_IP"] = client_ip or "unknown"
 
-    try:
-        ret = redirect(
-            f"{oac_settings.AUTHORIZE_URI}"
-            f"?scope=openid"
-            f"&client_id={oac_settings.CLIENT_ID}"
-            f"&redirect_uri={oac_settings.REDIRECT_URI}"
-            f"&state={state_str}"
-            "&response_type=code"
-        )
-    except ConfigurationError as err:
-        logger.error(str(err))
-        ret = render(
-            request,
-            TEMPLATES_DIR / "500.html",
-            {"message": "App config is incomplete, cannot continue."},
-            status=500,
+        ip_state = request.session["OAC_CLIENT_IP"], request.session["OAC_STATE_STR"]
+        state = state_str
+
+    with log_context("views.authenticate_view", *ip_state):
+        context_logger.info(
+            "authentication request", extra={"event": "authentication_request"}
         )
+
+        try:
+            ret = redirect(
+                f"{oac_settings.AUTHORIZE_URI}"
+                f"?scope=openid"
+                f"&client_id={oac_settings.CLIENT_ID}"
+                f"&redirect_uri={oac_settings.REDIRECT_URI}"
+                f"&state={state}"
+                "&response_type=code"
+            )
+        except ConfigurationError as err:
+            context_logger.error(str(err))
+            ret = render(
+                request,
+                TEMPLATES_DIR / "500.html",
+                {"message": "App config is incomplete, cannot continue."},
+                status=500,
+            )
     return ret
 
 
 @require_GET
+@traced("django_oac.callback_view")
+@server_timing
 @populate_logger
 @validate_query_string
 @validate_state_matching
 @validate_state_expiration
 def callback_view(request: HttpRequest, logger: Logger = None) -> HttpResponse:
-    logger.info("callback request")
+    logger.info("callback request", extra={"event": "callback_request"})
 
     code = request.GET.get("code")
 
     try:
-        user = authenticate(request, code=code)
+        with deadline(oac_settings.REQUEST_DEADLINE):
+            user = _authenticate_once(request, code)
+    except CodeReplayError as err:
+        logger.info(str(err))
+        ret = render(
+            request,
+            TEMPLATES_DIR / "400.html",
+            {
+                "redirect_url": reverse_lazy("django_oac:authenticate"),
+                "redirect_name": "authentication site",
+                "error_message": "Logging attempt has already been handled, try again.",
+            },
+            status=400,
+        )
     except ConfigurationError as err:
         logger.error(str(err))
         ret = render(
@@ -100,7 +191,7 @@ def callback_view(request: HttpRequest, logger: Logger = None) -> HttpResponse:
         ValueError,
     ) as err:
         logger.error(
-            f"raised {err.__class__.__module__}.{err.__class__.__name__}: {err}"
+            "raised %s.%s: %s", err.__class__.__module__, err.__class__.__name__, err
         )
         ret = render(
             request,
@@ -110,11 +201,11 @@ def callback_view(request: HttpRequest, logger: Logger = None) -> HttpResponse:
         )
     else:
         if user:
-            logger.info(f"user '{user.email}' authenticated")
+            logger.info("user '%s' authenticated", user.email, extra={"event": "login"})
             login(request, user, backend="django_oac.backends.OAuthClientBackend")
             ret = redirect("django_oac:profile")
         else:
-            logger.info("login forbidden")
+            logger.info("login forbidden", extra={"event": "login_forbidden"})
             ret = render(
                 request,
                 TEMPLATES_DIR / "403.html",
@@ -122,23 +213,36 @@ def callback_view(request: HttpRequest, logger: Logger = None) -> HttpResponse:
                 status=403,
             )
 
-    request.session["OAC_STATE_TIMESTAMP"] = 0
+    if not oac_settings.STATELESS_STATE:
+        request.session["OAC_STATE_TIMESTAMP"] = 0
 
     return ret
 
 
+def _queue_revocation(token: Token) -> None:
+    with transaction.atomic():
+        PendingRevocation.objects.create(refresh_token=token.refresh_token)
+        token.delete()
+
+
 @require_GET
 @login_required(login_url=reverse_lazy("django_oac:authenticate"))
 @populate_logger
 def logout_view(request: HttpRequest, logger: Logger = None) -> HttpResponse:
-    logger.info("logout request")
+    logger.info("logout request", extra={"event": "logout_request"})
 
     token = request.user.token_set.last()
 
     ret = redirect("django_oac:profile")
-    if token:
+    if token and oac_settings.ASYNC_REVOCATION:
+        _queue_revocation(token)
+        logger.info(
+            "refresh token for user '%s' queued for revocation", request.user.email
+        )
+    elif token:
         try:
-            token.revoke()
+            # provider deletes revoked token
+            TokenProvider().revoke(token)
         except ConfigurationError as err:
             logger.error(str(err))
             ret = render(
@@ -148,31 +252,82 @@ def logout_view(request: HttpRequest, logger: Logger = None) -> HttpResponse:
                 status=500,
             )
         except ProviderResponseError as err:
-            logger.error(f"raised django_oac.exceptions.ProviderResponseError: {err}")
+            logger.error("raised django_oac.exceptions.ProviderResponseError: %s", err)
             ret = render(
                 request,
                 TEMPLATES_DIR / "500.html",
                 {"message": "Something went wrong, cannot continue."},
                 status=500,
             )
+        except (ProviderRequestError, RequestException) as err:
+            # provider is unreachable, user is logged out and token revoked later
+            logger.error(
+                "raised %s.%s: %s",
+                err.__class__.__module__,
+                err.__class__.__name__,
+                err,
+            )
+            _queue_revocation(token)
+            logger.info(
+                "refresh token for user '%s' queued for revocation", request.user.email
+            )
         else:
             logger.info(
-                f"refresh token for user '{request.user.email}' has been revoked"
+                "refresh token for user '%s' has been revoked", request.user.email
             )
-            token.delete()
 
     email = request.user.email
     logout(request)
-    logger.info(f"user '{email}' logged out")
+    logger.info("user '%s' logged out", email, extra={"event": "logout"})
 
     return ret
 
 
+def _get_profile_etag(request: HttpRequest) -> Union[str, None]:
+    if not request.user.is_authenticated:
+        return None
+
+    return f'"{request.user.pk}-{get_profile_version(request.user.pk)}"'
+
+
+def _get_profile_last_modified(request: HttpRequest) -> Union[datetime, None]:
+    if not request.user.is_authenticated:
+        return None
+
+    return datetime.fromtimestamp(get_profile_version(request.user.pk), tz=timezone.utc)
+
+
 @require_GET
-def profile_view(request: HttpRequest) -> JsonResponse:
-    return JsonResponse(
+@condition(etag_func=_get_profile_etag, last_modified_func=_get_profile_last_modified)
+def profile_view(request: HttpRequest) -> HttpResponse:
+    cache_key = None
+    if oac_settings.PROFILE_CACHE_TIMEOUT is not None and request.user.is_authenticated:
+        cache_key = (
+            f"{__package__}:profile:{request.user.pk}"
+            f":{get_profile_version(request.user.pk)}"
+        )
+        content = cache.get(cache_key)
+        if content is not None:
+            return HttpResponse(content, content_type="application/json")
+
+    response = JsonResponse(
         {
             field: getattr(request.user, field, "")
             for field in ("first_name", "last_name", "email", "username")
         }
     )
+
+    if cache_key:
+        cache.set(cache_key, response.content, oac_settings.PROFILE_CACHE_TIMEOUT)
+
+    return response
+
+
+@require_GET
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    if not oac_settings.METRICS_VIEW:
+        raise Http404()
+
+    return HttpResponse(
+        export_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,55 @@
+from unittest.mock import Mock, PropertyMock, patch
+from uuid import uuid4
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.shortcuts import reverse
+from django.utils import timezone
+
+from ..common import ID_TOKEN_PAYLOAD, USER_PAYLOAD
+
+pytest.importorskip("pytest_benchmark")
+
+UserModel = get_user_model()
+
+
+@pytest.mark.django_db
+@patch("django_oac.services.requests")
+def test_callback_view(mock_services_requests, benchmark, client, oac_jwt):
+    oac_jwt.kid = "foo"
+    oac_jwt.id_token = ID_TOKEN_PAYLOAD
+    UserModel.objects.create(**USER_PAYLOAD)
+
+    mock_post_response = Mock()
+    type(mock_post_response).status_code = PropertyMock(return_value=200)
+    id_token = oac_jwt.id_token
+    # token provider pops 'id_token', every round needs fresh payload
+    mock_post_response.json.side_effect = lambda: {
+        "access_token": "foo",
+        "refresh_token": "bar",
+        "expires_in": 3600,
+        "id_token": id_token,
+    }
+    mock_get_response = Mock()
+    type(mock_get_response).status_code = PropertyMock(return_value=200)
+    type(mock_get_response).content = PropertyMock(return_value=oac_jwt.jwks)
+    mock_services_requests.post.return_value = mock_post_response
+    mock_services_requests.get.return_value = mock_get_response
+
+    def setup():
+        client.logout()
+        session = client.session
+        session["OAC_STATE_STR"] = "test"
+        session["OAC_STATE_TIMESTAMP"] = timezone.now().timestamp()
+        session["OAC_CLIENT_IP"] = "127.0.0.1"
+        session.save()
+
+        # new code every round, repeated one would be served from cache
+        return (
+            reverse("django_oac:callback"),
+            {"state": "test", "code": uuid4().hex},
+        ), {}
+
+    response = benchmark.pedantic(client.get, setup=setup, rounds=50)
+
+    assert response.status_code == 302
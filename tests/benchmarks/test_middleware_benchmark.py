@@ -0,0 +1,66 @@
+from unittest.mock import Mock, PropertyMock
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+
+from django_oac.middleware import OAuthClientMiddleware
+
+from ..common import SESSION_DICT
+
+pytest.importorskip("pytest_benchmark")
+
+
+def _get_request(rf, token):
+    user = Mock()
+    type(user).email = "spam@eggs"
+    user.token_set.last.return_value = token
+
+    request = rf.get("foo")
+    request.session = dict(SESSION_DICT)
+    request.user = user
+
+    return request
+
+
+def _get_token(has_expired: bool) -> Mock:
+    token = Mock()
+    type(token).has_expired = PropertyMock(return_value=has_expired)
+
+    return token
+
+
+def test_anonymous_user(benchmark, rf):
+    request = rf.get("foo")
+    request.session = {}
+    request.user = AnonymousUser()
+    middleware = OAuthClientMiddleware(lambda request: None)
+
+    benchmark(middleware, request)
+
+
+def test_valid_token(benchmark, rf):
+    request = _get_request(rf, _get_token(has_expired=False))
+    middleware = OAuthClientMiddleware(lambda request: None)
+
+    benchmark(middleware, request)
+
+    assert request.oac_token is not None
+
+
+def test_expired_token(benchmark, rf):
+    request = _get_request(rf, _get_token(has_expired=True))
+    # provider is mocked, only middleware's own work is measured
+    middleware = OAuthClientMiddleware(lambda request: None, token_provider=Mock())
+
+    benchmark(middleware, request)
+
+    assert request.oac_token is not None
+
+
+def test_no_token(benchmark, rf):
+    request = _get_request(rf, None)
+    middleware = OAuthClientMiddleware(lambda request: None)
+
+    benchmark(middleware, request)
+
+    assert request.oac_token is None
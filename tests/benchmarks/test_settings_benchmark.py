@@ -0,0 +1,17 @@
+import pytest
+
+from django_oac.conf import settings as oac_settings
+
+pytest.importorskip("pytest_benchmark")
+
+
+def test_plain_setting(benchmark):
+    benchmark(lambda: oac_settings.CLIENT_ID)
+
+
+def test_default_setting(benchmark):
+    benchmark(lambda: oac_settings.TIMEOUT)
+
+
+def test_import_string_setting(benchmark):
+    benchmark(lambda: oac_settings.TOKEN_PROVIDER_CLASS)
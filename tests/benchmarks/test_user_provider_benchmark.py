@@ -0,0 +1,45 @@
+from unittest.mock import Mock, PropertyMock, patch
+
+import pytest
+from django.core.cache import cache
+
+from django_oac.models_providers.user_provider import DefaultUserProvider
+
+from ..common import ID_TOKEN_PAYLOAD
+
+pytest.importorskip("pytest_benchmark")
+
+
+@pytest.fixture
+def id_token(oac_jwt):
+    oac_jwt.kid = "foo"
+    oac_jwt.id_token = ID_TOKEN_PAYLOAD
+
+    mock_get_response = Mock()
+    type(mock_get_response).status_code = PropertyMock(return_value=200)
+    type(mock_get_response).content = PropertyMock(return_value=oac_jwt.jwks)
+
+    with patch("django_oac.services.requests") as mock_services_requests:
+        mock_services_requests.get.return_value = mock_get_response
+        yield oac_jwt.id_token
+
+
+def test_decode_id_token_cold_jwks(benchmark, id_token):
+    provider = DefaultUserProvider()
+
+    def setup():
+        cache.clear()
+        return (id_token,), {}
+
+    data = benchmark.pedantic(provider.decode_id_token, setup=setup, rounds=100)
+
+    assert data["email"] == ID_TOKEN_PAYLOAD["email"]
+
+
+def test_decode_id_token_warm_jwks(benchmark, id_token):
+    provider = DefaultUserProvider()
+    provider.decode_id_token(id_token)
+
+    data = benchmark(provider.decode_id_token, id_token)
+
+    assert data["email"] == ID_TOKEN_PAYLOAD["email"]
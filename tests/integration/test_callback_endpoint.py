@@ -1,8 +1,10 @@
 import json
 from unittest.mock import Mock, PropertyMock, patch
+from urllib.parse import parse_qs, urlsplit
 
 import pytest
 from django.shortcuts import reverse
+from django.test import Client
 from django.utils import timezone
 
 from ..common import ID_TOKEN_PAYLOAD, USER_PAYLOAD
@@ -42,3 +44,72 @@ def test_callback_endpoint(mock_services_requests, client, oac_jwt):
 
     assert response.status_code == 200
     assert json.loads(response.content) == USER_PAYLOAD
+
+
+def _mock_provider(mock_services_requests: Mock, oac_jwt) -> None:
+    oac_jwt.kid = "foo"
+    oac_jwt.id_token = ID_TOKEN_PAYLOAD
+
+    mock_post_response = Mock()
+    type(mock_post_response).status_code = PropertyMock(return_value=200)
+    mock_post_response.json.side_effect = lambda: {
+        "access_token": "foo",
+        "refresh_token": "bar",
+        "expires_in": 3600,
+        "id_token": oac_jwt.id_token,
+    }
+
+    mock_get_response = Mock()
+    type(mock_get_response).status_code = PropertyMock(return_value=200)
+    type(mock_get_response).content = PropertyMock(return_value=oac_jwt.jwks)
+
+    mock_services_requests.post.return_value = mock_post_response
+    mock_services_requests.get.return_value = mock_get_response
+
+
+@pytest.mark.django_db
+@patch("django_oac.services.requests")
+def test_callback_endpoint_code_of_other_session(
+    mock_services_requests, client, oac_jwt
+):
+    _mock_provider(mock_services_requests, oac_jwt)
+    other_client = Client()
+    for session in (client.session, other_client.session):
+        session["OAC_STATE_STR"] = "test"
+        session["OAC_STATE_TIMESTAMP"] = timezone.now().timestamp()
+        session["OAC_CLIENT_IP"] = "127.0.0.1"
+        session.save()
+
+    response = client.get(
+        reverse("django_oac:callback"), {"state": "test", "code": "foo"}
+    )
+    other_response = other_client.get(
+        reverse("django_oac:callback"), {"state": "test", "code": "foo"}
+    )
+
+    assert response.status_code == 302
+    assert other_response.status_code == 400
+    assert "_auth_user_id" not in other_client.session
+    mock_services_requests.post.assert_called_once()
+
+
+@pytest.mark.django_db
+@patch("django_oac.services.requests")
+def test_callback_endpoint_stateless_callback_of_other_browser(
+    mock_services_requests, client, settings, oac_jwt
+):
+    settings.OAC = {**settings.OAC, "STATELESS_STATE": True}
+    _mock_provider(mock_services_requests, oac_jwt)
+
+    location = client.get(reverse("django_oac:authenticate"))["Location"]
+    query = {"state": parse_qs(urlsplit(location).query)["state"][0], "code": "foo"}
+
+    response = client.get(reverse("django_oac:callback"), query)
+    # callback URL replayed from another browser behind the same IP
+    other_client = Client()
+    other_response = other_client.get(reverse("django_oac:callback"), query)
+
+    assert response.status_code == 302
+    assert other_response.status_code == 400
+    assert "_auth_user_id" not in other_client.session
+    mock_services_requests.post.assert_called_once()
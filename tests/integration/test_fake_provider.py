@@ -0,0 +1,124 @@
+from io import StringIO
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlsplit
+
+import jwt
+import pytest
+import requests
+from django.core.management import call_command
+
+from django_oac.conf import settings as oac_settings
+from django_oac.exceptions import ProviderResponseError
+from django_oac.fake_provider import FakeProvider
+from django_oac.services import OAuthJWKSService, OAuthRequestService
+
+
+@pytest.fixture
+def provider():
+    with FakeProvider(
+        client_id=oac_settings.CLIENT_ID, client_secret=oac_settings.CLIENT_SECRET
+    ) as provider:
+        yield provider
+
+
+def _authorize(provider: FakeProvider, login_hint: str = "spam") -> str:
+    response = requests.get(
+        provider.url("authorize"),
+        params={
+            "client_id": oac_settings.CLIENT_ID,
+            "redirect_uri": oac_settings.REDIRECT_URI,
+            "state": "test",
+            "login_hint": login_hint,
+        },
+        allow_redirects=False,
+    )
+
+    assert response.status_code == 302
+    location = urlsplit(response.headers["Location"])
+    query = parse_qs(location.query)
+    assert location.path == urlsplit(oac_settings.REDIRECT_URI).path
+    assert query["state"] == ["test"]
+
+    return query["code"][0]
+
+
+def _decode(provider: FakeProvider, id_token: str) -> dict:
+    kid = jwt.get_unverified_header(id_token)["kid"]
+    jwk, _ = OAuthJWKSService.fetch(kid, jwks_uri=provider.url("jwks"))
+
+    return jwt.decode(
+        id_token,
+        key=jwt.algorithms.RSAAlgorithm.from_jwk(jwk),
+        algorithms=["RS256"],
+        audience=oac_settings.CLIENT_ID,
+    )
+
+
+def test_fake_provider_login_refresh_and_revoke(provider):
+    code = _authorize(provider)
+
+    data = OAuthRequestService.get_access_token(code, token_uri=provider.url("token"))
+    assert _decode(provider, data["id_token"])["email"] == "spam@fake.provider"
+
+    with pytest.raises(ProviderResponseError):
+        OAuthRequestService.get_access_token(code, token_uri=provider.url("token"))
+
+    refreshed = OAuthRequestService.refresh_access_token(
+        data["refresh_token"], token_uri=provider.url("token")
+    )
+    assert refreshed["access_token"] != data["access_token"]
+
+    OAuthRequestService.revoke_refresh_token(
+        refreshed["refresh_token"], revoke_uri=provider.url("revoke")
+    )
+    with pytest.raises(ProviderResponseError):
+        OAuthRequestService.refresh_access_token(
+            refreshed["refresh_token"], token_uri=provider.url("token")
+        )
+
+    assert provider.calls == {"authorize": 1, "token": 4, "revoke": 1, "jwks": 1}
+
+
+def test_fake_provider_rejects_unknown_client(provider):
+    with pytest.raises(ProviderResponseError):
+        OAuthRequestService.get_access_token(
+            _authorize(provider), client_secret="foo", token_uri=provider.url("token")
+        )
+
+
+def test_fake_provider_key_rotation(provider):
+    old_token = OAuthRequestService.get_access_token(
+        _authorize(provider), token_uri=provider.url("token")
+    )["id_token"]
+    old_kid = provider.kid
+
+    provider.rotate_key()
+    new_token = OAuthRequestService.get_access_token(
+        _authorize(provider), token_uri=provider.url("token")
+    )["id_token"]
+
+    assert jwt.get_unverified_header(new_token)["kid"] == provider.kid != old_kid
+    assert _decode(provider, old_token)["sub"] == "spam"
+    assert _decode(provider, new_token)["sub"] == "spam"
+
+
+def test_fake_provider_error_injection(provider):
+    provider.error_rate = 1
+
+    with pytest.raises(ProviderResponseError):
+        OAuthRequestService.get_access_token("foo", token_uri=provider.url("token"))
+
+    assert provider.calls == {"token": 1}
+
+
+@patch("django_oac.management.commands.oac_fake_provider.FakeProvider")
+def test_fake_provider_command(mock_provider):
+    mock_provider.return_value.url.side_effect = lambda endpoint: endpoint
+
+    call_command(
+        "oac_fake_provider", "--port", "0", "--latency", "0.1", stdout=StringIO()
+    )
+
+    assert mock_provider.call_args.kwargs["latency"] == 0.1
+    assert mock_provider.call_args.kwargs["client_id"] == oac_settings.CLIENT_ID
+    mock_provider.return_value.server.serve_forever.assert_called_once()
@@ -0,0 +1,69 @@
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+import requests
+from django.core.management import CommandError, call_command
+
+from django_oac.conf import settings as oac_settings
+from django_oac.fake_provider import FakeProvider
+from django_oac.models import Token
+
+
+class LoopbackRequests:
+    # sends requests meant for configured provider to the local one
+    def __init__(self, provider_url: str, base_url: str) -> None:
+        self.provider_url = provider_url
+        self.base_url = base_url
+
+    def __getattr__(self, method: str):
+        return lambda url, **kwargs: getattr(requests, method)(
+            url.replace(self.provider_url, self.base_url), **kwargs
+        )
+
+
+# sqlite test database does not take concurrent writes, users run one by one
+@pytest.mark.django_db(transaction=True)
+def test_load_test_command():
+    out = StringIO()
+
+    with FakeProvider(
+        client_id=oac_settings.CLIENT_ID, client_secret=oac_settings.CLIENT_SECRET
+    ) as provider:
+        loopback = LoopbackRequests("https://your.oauth.provider", provider.base_url)
+        with patch("django_oac.services.requests", loopback), patch(
+            "django_oac.management.commands.oac_load_test.requests", loopback
+        ):
+            call_command(
+                "oac_load_test",
+                "--users",
+                "3",
+                "--concurrency",
+                "1",
+                "--requests",
+                "2",
+                stdout=out,
+            )
+
+    lines = out.getvalue().splitlines()
+    assert lines[0].startswith("users: 3, failed: 0, requests: 18,")
+    assert [line.split()[:2] for line in lines[2:7]] == [
+        ["authenticate", "3"],
+        ["callback", "3"],
+        ["request", "6"],
+        ["refresh", "3"],
+        ["logout", "3"],
+    ]
+    assert lines[7:] == [
+        "provider calls per user:",
+        "  jwks: 0.33",
+        "  revoke: 1.00",
+        "  token: 2.00",
+    ]
+    assert provider.calls == {"authorize": 3, "token": 6, "revoke": 3, "jwks": 1}
+    assert not Token.objects.exists()
+
+
+def test_load_test_command_requires_users():
+    with pytest.raises(CommandError):
+        call_command("oac_load_test", "--users", "0", stdout=StringIO())
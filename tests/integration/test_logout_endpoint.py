@@ -3,6 +3,10 @@ import json
 import pytest
 from django.contrib.auth import get_user_model
 from django.shortcuts import reverse
+from django.utils import timezone
+
+from django_oac.models import PendingRevocation, Token
+from django_oac.resilience import CircuitBreaker
 
 UserModel = get_user_model()
 
@@ -28,3 +32,53 @@ def test_logout_endpoint(client):
         "email": "",
         "username": "",
     }
+
+
+@pytest.mark.django_db
+def test_logout_endpoint_queues_revocation(client, settings):
+    settings.OAC = {**settings.OAC, "ASYNC_REVOCATION": True}
+
+    user = UserModel.objects.create(
+        first_name="spam", last_name="eggs", email="spam@eggs", username="spam.eggs"
+    )
+    Token.objects.create(
+        access_token="foo",
+        refresh_token="bar",
+        expires_in=3600,
+        issued=timezone.now(),
+        user=user,
+    )
+    client.force_login(user, backend="django_oac.backends.OAuthClientBackend")
+
+    response = client.get(reverse("django_oac:logout"))
+
+    assert response.status_code == 302
+    assert not Token.objects.exists()
+    assert list(PendingRevocation.objects.values_list("refresh_token", flat=True)) == [
+        "bar"
+    ]
+
+
+@pytest.mark.django_db
+def test_logout_endpoint_circuit_open(client):
+    user = UserModel.objects.create(
+        first_name="spam", last_name="eggs", email="spam@eggs", username="spam.eggs"
+    )
+    Token.objects.create(
+        access_token="foo",
+        refresh_token="bar",
+        expires_in=3600,
+        issued=timezone.now(),
+        user=user,
+    )
+    client.force_login(user, backend="django_oac.backends.OAuthClientBackend")
+    CircuitBreaker("revoke").open()
+
+    response = client.get(reverse("django_oac:logout"))
+
+    assert response.status_code == 302
+    assert "_auth_user_id" not in client.session
+    assert not Token.objects.exists()
+    assert list(PendingRevocation.objects.values_list("refresh_token", flat=True)) == [
+        "bar"
+    ]
@@ -1,5 +1,8 @@
+from urllib.parse import parse_qs, urlparse
+
 from django.shortcuts import reverse
 
+from django_oac.helpers import load_state
 from django_oac.views import authenticate_view
 
 
@@ -25,3 +28,19 @@ def test_authenticate_view_succeeded(rf,):
     response = authenticate_view(request)
 
     assert response.status_code == 302
+
+
+# pylint: disable=invalid-name
+def test_authenticate_view_stateless_state(settings, rf):
+    settings.OAC = {**settings.OAC, "STATELESS_STATE": True}
+
+    request = rf.get(reverse("django_oac:authenticate"))
+    request.session = {}
+
+    response = authenticate_view(request)
+
+    state = parse_qs(urlparse(response.url).query)["state"][0]
+
+    assert response.status_code == 302
+    assert not request.session
+    assert load_state(state)["ip"] == "127.0.0.1"
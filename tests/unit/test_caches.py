@@ -0,0 +1,81 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from unittest.mock import Mock
+
+import pytest
+
+from django_oac.caches import LRUCache, coalesce
+
+
+def test_get_and_set():
+    cache = LRUCache(2)
+    cache.set("foo", "bar", time.time() + 60)
+
+    assert cache.get("foo") == "bar"
+    assert cache.get("spam") is None
+
+
+def test_expired_entry():
+    cache = LRUCache(2)
+    cache.set("foo", "bar", time.time() - 1)
+
+    assert cache.get("foo") is None
+    assert not len(cache)
+
+
+def test_least_recently_used_eviction():
+    cache = LRUCache(2)
+    cache.set("foo", 1, time.time() + 60)
+    cache.set("bar", 2, time.time() + 60)
+    cache.get("foo")
+    cache.set("baz", 3, time.time() + 60)
+
+    assert cache.get("foo") == 1
+    assert cache.get("bar") is None
+    assert cache.get("baz") == 3
+
+
+def test_clear():
+    cache = LRUCache(2)
+    cache.set("foo", "bar", time.time() + 60)
+    cache.clear()
+
+    assert not len(cache)
+
+
+def test_coalesce():
+    started = Event()
+    release = Event()
+    func = Mock()
+
+    def slow_func():
+        started.set()
+        release.wait(5)
+        return func()
+
+    func.return_value = "foo"
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        leader = executor.submit(coalesce, "foo", slow_func)
+        started.wait(5)
+        followers = [executor.submit(coalesce, "foo", func) for _ in range(3)]
+        time.sleep(0.1)
+        release.set()
+
+        results = [leader.result()] + [future.result() for future in followers]
+
+    assert results == ["foo"] * 4
+    func.assert_called_once()
+
+
+def test_coalesce_exception():
+    func = Mock(side_effect=ValueError("foo"))
+
+    with pytest.raises(ValueError):
+        coalesce("foo", func)
+
+    func.side_effect = None
+    func.return_value = "bar"
+
+    assert coalesce("foo", func) == "bar"
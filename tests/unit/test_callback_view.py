@@ -1,18 +1,29 @@
 import logging
+from copy import copy
+from hashlib import sha256
 from unittest.mock import Mock, patch
 
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.handlers.wsgi import WSGIRequest
 from jwt.exceptions import ExpiredSignatureError
 
 from django_oac.apps import DjangoOACConfig
 from django_oac.exceptions import ConfigurationError, ProviderResponseError
-from django_oac.views import callback_view
+from django_oac.views import _get_code_owner, callback_view
+
+from ..common import QUERY_DICT, SESSION_DICT
 
 UserModel = get_user_model()
 
 
+class Session(dict):
+    def __init__(self, *args, session_key: str = None) -> None:
+        super().__init__(*args)
+        self.session_key = session_key
+
+
 def _login(request: WSGIRequest, user: UserModel, backend: str = ""):
     request.user = user
     request.session["_auth_user_backend"] = backend
@@ -54,7 +65,7 @@ def test_callback_view_failure_other_exceptions(
     response = callback_view(oac_valid_get_request)
 
     assert response.status_code == expected_status_code
-    assert caplog.records[0].msg == expected_message
+    assert caplog.records[0].getMessage() == expected_message
 
 
 @patch("django_oac.views.login")
@@ -81,3 +92,111 @@ def test_callback_view_user_not_authenticated(mock_authenticate, oac_valid_get_r
     response = callback_view(oac_valid_get_request)
 
     assert response.status_code == 403
+
+
+@patch("django_oac.views.OAuthClientBackend.get_user")
+@patch("django_oac.views.login")
+@patch("django_oac.views.authenticate")
+def test_callback_view_repeated_code_reuses_user(
+    mock_authenticate, mock_login, mock_get_user, rf
+):
+    user = Mock()
+    type(user).pk = 1
+    type(user).email = "spam@eggs"
+
+    mock_authenticate.return_value = user
+    mock_login.side_effect = _login
+    mock_get_user.return_value = user
+
+    for _ in range(2):
+        request = rf.get("foo", QUERY_DICT)
+        request.session = Session(SESSION_DICT, session_key="foo")
+
+        response = callback_view(request)
+
+        assert response.status_code == 302
+
+    mock_authenticate.assert_called_once()
+    mock_get_user.assert_called_once_with("1")
+
+
+@patch("django_oac.views.authenticate")
+def test_callback_view_repeated_code_failure(mock_authenticate, rf):
+    mock_authenticate.side_effect = ProviderResponseError("foo")
+
+    status_codes = []
+    for _ in range(2):
+        request = rf.get("foo", QUERY_DICT)
+        request.session = copy(SESSION_DICT)
+
+        status_codes.append(callback_view(request).status_code)
+
+    assert status_codes == [500, 400]
+    mock_authenticate.assert_called_once()
+
+
+@patch("django_oac.views.authenticate")
+def test_callback_view_pending_code(mock_authenticate, settings, oac_valid_get_request):
+    settings.OAC = {**settings.OAC, "CODE_WAIT_TIMEOUT": 0.2}
+
+    cache.set(
+        f"django_oac:code:{sha256(b'foo').hexdigest()}",
+        (_get_code_owner(oac_valid_get_request), "pending"),
+    )
+
+    response = callback_view(oac_valid_get_request)
+
+    assert response.status_code == 400
+    mock_authenticate.assert_not_called()
+
+
+@patch("django_oac.views.OAuthClientBackend.get_user")
+@patch("django_oac.views.login")
+@patch("django_oac.views.authenticate")
+def test_callback_view_repeated_code_of_other_session(
+    mock_authenticate, mock_login, mock_get_user, rf
+):
+    user = Mock()
+    type(user).pk = 1
+    type(user).email = "spam@eggs"
+
+    mock_authenticate.return_value = user
+    mock_login.side_effect = _login
+    mock_get_user.return_value = user
+
+    status_codes = []
+    for session_key in ("foo", "bar"):
+        request = rf.get("foo", QUERY_DICT)
+        request.session = Session(SESSION_DICT, session_key=session_key)
+
+        status_codes.append(callback_view(request).status_code)
+
+    assert status_codes == [302, 400]
+    mock_authenticate.assert_called_once()
+    mock_get_user.assert_not_called()
+
+
+@patch("django_oac.views.OAuthClientBackend.get_user")
+@patch("django_oac.views.login")
+@patch("django_oac.views.authenticate")
+def test_callback_view_repeated_code_without_session(
+    mock_authenticate, mock_login, mock_get_user, rf
+):
+    user = Mock()
+    type(user).pk = 1
+    type(user).email = "spam@eggs"
+
+    mock_authenticate.return_value = user
+    mock_login.side_effect = _login
+    mock_get_user.return_value = user
+
+    status_codes = []
+    for _ in range(2):
+        request = rf.get("foo", QUERY_DICT)
+        request.session = Session(SESSION_DICT)
+
+        status_codes.append(callback_view(request).status_code)
+
+    assert status_codes == [302, 400]
+    mock_authenticate.assert_called_once()
+    mock_get_user.assert_not_called()
@@ -0,0 +1,78 @@
+import time
+from unittest.mock import patch
+
+import pytest
+import responses
+from requests.exceptions import ConnectionError as RequestsConnectionError
+
+from django_oac.conf import settings as oac_settings
+from django_oac.exceptions import CircuitOpenError
+from django_oac.resilience import CircuitBreaker
+from django_oac.services import OAuthRequestService
+
+
+def test_open_after_threshold():
+    circuit_breaker = CircuitBreaker("foo")
+
+    for _ in range(oac_settings.CIRCUIT_BREAKER_THRESHOLD - 1):
+        circuit_breaker.record_failure()
+    circuit_breaker.allow()
+
+    circuit_breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        circuit_breaker.allow()
+
+
+def test_success_resets_failures():
+    circuit_breaker = CircuitBreaker("foo")
+
+    for _ in range(oac_settings.CIRCUIT_BREAKER_THRESHOLD - 1):
+        circuit_breaker.record_failure()
+    circuit_breaker.record_success()
+    circuit_breaker.record_failure()
+
+    circuit_breaker.allow()
+
+
+@pytest.mark.parametrize("trial_succeeded", [True, False])
+def test_half_open(trial_succeeded):
+    circuit_breaker = CircuitBreaker("foo")
+    circuit_breaker.open()
+
+    with patch(
+        "django_oac.resilience.time.time",
+        return_value=time.time() + oac_settings.CIRCUIT_BREAKER_RESET_TIMEOUT,
+    ):
+        circuit_breaker.allow()
+        with pytest.raises(CircuitOpenError):
+            circuit_breaker.allow()
+
+        if trial_succeeded:
+            circuit_breaker.record_success()
+            circuit_breaker.allow()
+        else:
+            circuit_breaker.record_failure()
+
+    if not trial_succeeded:
+        with pytest.raises(CircuitOpenError):
+            circuit_breaker.allow()
+
+
+@responses.activate
+def test_open_circuit_fails_fast():
+    responses.add(
+        responses.POST,
+        oac_settings.TOKEN_URI,
+        body=RequestsConnectionError("foo"),
+    )
+
+    service = OAuthRequestService()
+
+    for _ in range(oac_settings.CIRCUIT_BREAKER_THRESHOLD):
+        with pytest.raises(RequestsConnectionError):
+            service.get_access_token("spam")
+
+    with pytest.raises(CircuitOpenError):
+        service.get_access_token("spam")
+
+    assert len(responses.calls) == oac_settings.CIRCUIT_BREAKER_THRESHOLD
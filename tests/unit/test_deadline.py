@@ -0,0 +1,45 @@
+import time
+from unittest.mock import patch
+
+import pytest
+
+from django_oac.deadline import check_deadline, deadline, get_remaining, get_timeout
+from django_oac.exceptions import DeadlineExceededError
+
+
+def test_no_deadline():
+    assert get_remaining() is None
+    assert get_timeout("token") == (3.05, 10)
+
+    check_deadline()
+
+
+def test_endpoint_timeout(settings):
+    settings.OAC = {**settings.OAC, "ENDPOINT_TIMEOUTS": {"jwks": 2}}
+
+    assert get_timeout("jwks") == (2, 2)
+    assert get_timeout("token") == (3.05, 10)
+
+
+def test_nested_deadline():
+    with deadline(5):
+        with deadline(10):
+            assert get_remaining() <= 5
+        with deadline(1):
+            connect, read = get_timeout("token")
+
+            assert connect <= 1
+            assert read <= 1
+
+    assert get_remaining() is None
+
+
+def test_deadline_exceeded():
+    with deadline(1):
+        with patch(
+            "django_oac.deadline.time.monotonic", return_value=time.monotonic() + 2
+        ):
+            with pytest.raises(DeadlineExceededError):
+                get_timeout("token")
+            with pytest.raises(DeadlineExceededError):
+                check_deadline()
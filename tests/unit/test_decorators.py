@@ -1,5 +1,6 @@
 from logging import Logger
-from unittest.mock import Mock
+from time import time
+from unittest.mock import Mock, patch
 
 import pytest
 from django.http import HttpRequest, HttpResponse
@@ -10,6 +11,7 @@ from django_oac.decorators import (
     validate_state_expiration,
     validate_state_matching,
 )
+from django_oac.helpers import sign_state
 
 
 @pytest.mark.parametrize(
@@ -68,3 +70,80 @@ def test_validate_state_matching(query_dict, oac_state_str, expected_status_code
     response = test_func(request, Mock())
 
     assert response.status_code == expected_status_code
+
+
+@pytest.mark.parametrize(
+    "seconds,expected_status_code",
+    [(301, 400), (299, 200)],
+)
+def test_validate_signed_state_expiration(seconds, expected_status_code, rf, settings):
+    settings.OAC = {**settings.OAC, "STATELESS_STATE": True}
+
+    @validate_state_expiration
+    def test_func(_: HttpRequest, __: Logger = None) -> HttpResponse:
+        return HttpResponse("foo")
+
+    with patch("django.core.signing.time.time", return_value=time() - seconds):
+        state = sign_state("foo", "127.0.0.1")
+
+    request = rf.get("foo", {"state": state})
+
+    response = test_func(request, Mock())
+
+    assert response.status_code == expected_status_code
+
+
+@pytest.mark.parametrize(
+    "state_str,client_ip,signed_client_ip,expected_status_code",
+    [
+        ("foo", "127.0.0.1", "127.0.0.1", 200),
+        ("foo", "127.0.0.2", "127.0.0.1", 400),
+        (None, "127.0.0.1", "127.0.0.1", 400),
+    ],
+)
+def test_validate_signed_state_matching(
+    state_str, client_ip, signed_client_ip, expected_status_code, rf, settings
+):
+    settings.OAC = {**settings.OAC, "STATELESS_STATE": True}
+
+    @validate_state_matching
+    def test_func(_: HttpRequest, __: Logger = None) -> HttpResponse:
+        return HttpResponse("foo")
+
+    state = sign_state(state_str, signed_client_ip) if state_str else "foo"
+
+    request = rf.get("foo", {"state": state}, REMOTE_ADDR=client_ip)
+
+    response = test_func(request, Mock())
+
+    assert response.status_code == expected_status_code
+
+
+def test_validate_signed_state_replay(rf, settings):
+    settings.OAC = {**settings.OAC, "STATELESS_STATE": True}
+
+    @validate_state_matching
+    def test_func(_: HttpRequest, __: Logger = None) -> HttpResponse:
+        return HttpResponse("foo")
+
+    state = sign_state("foo", "127.0.0.1")
+
+    def get(code: str) -> int:
+        return test_func(rf.get("foo", {"state": state, "code": code}), Mock())
+
+    assert get("spam").status_code == 200
+    assert get("spam").status_code == 400
+    assert get("eggs").status_code == 400
+
+
+def test_validate_signed_state_nonce_expires(rf, settings):
+    settings.OAC = {**settings.OAC, "STATELESS_STATE": True, "STATE_EXPIRES_IN": 120}
+
+    @validate_state_matching
+    def test_func(_: HttpRequest, __: Logger = None) -> HttpResponse:
+        return HttpResponse("foo")
+
+    with patch("django_oac.decorators.cache") as mock_cache:
+        test_func(rf.get("foo", {"state": sign_state("foo", "127.0.0.1")}), Mock())
+
+    assert mock_cache.add.call_args.args[2] == 120
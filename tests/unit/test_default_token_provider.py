@@ -19,6 +19,7 @@ def test_create_new_user():
     oauth_request_service.get_access_token.return_value = {
         **TOKEN_PAYLOAD,
         "id_token": "baz",
+        "token_type": "Bearer",
     }
 
     user = UserModel.objects.create(**USER_PAYLOAD)
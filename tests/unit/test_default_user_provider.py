@@ -3,7 +3,7 @@ from unittest.mock import Mock
 
 import pytest
 from django.contrib.auth import get_user_model
-from jwt.exceptions import InvalidSignatureError
+from jwt.exceptions import InvalidKeyError, InvalidSignatureError
 
 from django_oac.exceptions import InsufficientPayloadError
 from django_oac.models_providers.user_provider import DefaultUserProvider
@@ -179,10 +179,113 @@ def test_get_or_create_no_jwk_and_jwks(oac_jwt):
 
     provider = DefaultUserProvider()
 
-    with pytest.raises(Exception):
+    for _ in range(2):
+        with pytest.raises(InvalidKeyError):
+            provider.get_or_create(
+                oac_jwt.id_token,
+                lookup_field="email",
+                fetch_from_services=[mock_jwks_service, mock_jwks_service],
+                save_by_service=mock_jwks_service,
+            )
+
+    # unknown key id is remembered, provider is not asked again
+    assert mock_jwks_service.fetch.call_count == 2
+
+
+@pytest.mark.django_db
+def test_get_or_create_new_user_with_user_info(oac_jwt, settings):
+    settings.OAC = {
+        **settings.OAC,
+        "USERINFO_URI": "https://your.oauth.provider/userinfo/",
+    }
+
+    id_token_payload = {**ID_TOKEN_PAYLOAD, "sub": "spam"}
+    del id_token_payload["first_name"]
+
+    oac_jwt.kid = "foo"
+    oac_jwt.id_token = id_token_payload
+
+    mock_jwks_service = Mock()
+    mock_jwks_service.fetch.return_value = oac_jwt.jwk, oac_jwt.jwks
+
+    mock_userinfo_service = Mock()
+    mock_userinfo_service.fetch.return_value = {"sub": "spam", "first_name": "ham"}
+
+    provider = DefaultUserProvider()
+
+    user, created = provider.get_or_create(
+        oac_jwt.id_token,
+        lookup_field="email",
+        access_token="bar",
+        fetch_from_services=[mock_jwks_service, mock_jwks_service],
+        save_by_service=mock_jwks_service,
+        userinfo_service=mock_userinfo_service,
+    )
+
+    mock_userinfo_service.fetch.assert_called_once_with("bar", "spam")
+    assert created
+    assert user.first_name == "ham"
+
+
+@pytest.mark.django_db
+def test_get_or_create_existing_user_with_user_info(oac_jwt, settings):
+    settings.OAC = {
+        **settings.OAC,
+        "USERINFO_URI": "https://your.oauth.provider/userinfo/",
+    }
+
+    UserModel.objects.create(**USER_PAYLOAD)
+
+    oac_jwt.kid = "foo"
+    oac_jwt.id_token = {**ID_TOKEN_PAYLOAD, "sub": "spam"}
+
+    mock_jwks_service = Mock()
+    mock_jwks_service.fetch.return_value = oac_jwt.jwk, oac_jwt.jwks
+
+    mock_userinfo_service = Mock()
+    mock_userinfo_service.fetch.return_value = {"sub": "spam", "last_name": "ham"}
+
+    provider = DefaultUserProvider()
+
+    user, created = provider.get_or_create(
+        oac_jwt.id_token,
+        lookup_field="email",
+        access_token="bar",
+        fetch_from_services=[mock_jwks_service, mock_jwks_service],
+        save_by_service=mock_jwks_service,
+        userinfo_service=mock_userinfo_service,
+    )
+
+    assert not created
+    assert UserModel.objects.get(pk=user.pk).last_name == "ham"
+
+
+@pytest.mark.django_db
+def test_get_or_create_user_info_without_subject(oac_jwt, settings):
+    settings.OAC = {
+        **settings.OAC,
+        "USERINFO_URI": "https://your.oauth.provider/userinfo/",
+    }
+
+    oac_jwt.kid = "foo"
+    oac_jwt.id_token = ID_TOKEN_PAYLOAD
+
+    mock_jwks_service = Mock()
+    mock_jwks_service.fetch.return_value = oac_jwt.jwk, oac_jwt.jwks
+
+    mock_userinfo_service = Mock()
+    mock_userinfo_service.fetch.return_value = {}
+
+    provider = DefaultUserProvider()
+
+    with pytest.raises(InsufficientPayloadError):
         provider.get_or_create(
             oac_jwt.id_token,
             lookup_field="email",
+            access_token="bar",
             fetch_from_services=[mock_jwks_service, mock_jwks_service],
             save_by_service=mock_jwks_service,
+            userinfo_service=mock_userinfo_service,
         )
+
+    mock_userinfo_service.fetch.assert_not_called()
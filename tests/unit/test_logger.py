@@ -0,0 +1,129 @@
+import json
+import logging
+from queue import SimpleQueue
+from unittest.mock import patch
+
+import pytest
+
+from django_oac.exceptions import ConfigurationError
+from django_oac.logger import (
+    ContextAdapter,
+    ContextFilter,
+    JSONFormatter,
+    LazyQueueHandler,
+    SamplingFilter,
+    get_formatter,
+    log_context,
+)
+
+
+class Message:
+    formatted = 0
+
+    def __str__(self):
+        Message.formatted += 1
+        return "spam"
+
+
+def test_context_adapter(caplog):
+    adapter = ContextAdapter()
+    caplog.set_level(logging.INFO, logger="django_oac")
+
+    with log_context("foo", "127.0.0.1", "bar"):
+        adapter.info("first")
+    adapter.info("second")
+
+    assert [(record.scope, record.ip_state) for record in caplog.records] == [
+        ("foo", "127.0.0.1:bar"),
+        ("n/a", "n/a:n/a"),
+    ]
+
+
+def test_context_filter_keeps_explicit_extra():
+    record = logging.makeLogRecord({"scope": "foo"})
+
+    with log_context("bar", "127.0.0.1", "baz"):
+        assert ContextFilter().filter(record)
+
+    assert record.scope == "foo"
+    assert record.ip_state == "127.0.0.1:baz"
+
+
+def test_lazy_queue_handler_does_not_format():
+    Message.formatted = 0
+    queue = SimpleQueue()
+    handler = LazyQueueHandler(queue)
+    handler.addFilter(ContextFilter())
+    logger = logging.getLogger("django_oac.tests.lazy")
+    logger.addHandler(handler)
+    logger.propagate = False
+
+    try:
+        with log_context("foo"):
+            logger.warning("message: %s", Message())
+    finally:
+        logger.removeHandler(handler)
+
+    record = queue.get_nowait()
+    assert Message.formatted == 0
+    assert record.scope == "foo"
+    assert record.getMessage() == "message: spam"
+
+
+def test_json_formatter():
+    record = logging.makeLogRecord(
+        {
+            "name": "django_oac",
+            "levelno": logging.INFO,
+            "levelname": "INFO",
+            "msg": "user '%s' authenticated",
+            "args": ("spam@eggs",),
+            "event": "login",
+        }
+    )
+
+    with log_context("foo", "127.0.0.1", "bar", "spam"):
+        ContextFilter().filter(record)
+
+    data = json.loads(JSONFormatter().format(record))
+
+    assert list(data) == [
+        "time",
+        "level",
+        "logger",
+        "scope",
+        "client_ip",
+        "state",
+        "user",
+        "event",
+        "duration",
+        "message",
+    ]
+    assert data["client_ip"] == "127.0.0.1"
+    assert data["state"] == "bar"
+    assert data["user"] == "spam"
+    assert data["event"] == "login"
+    assert data["duration"] is None
+    assert data["message"] == "user 'spam@eggs' authenticated"
+
+
+def test_get_formatter_unknown():
+    with pytest.raises(ConfigurationError):
+        get_formatter("xml")
+
+
+@pytest.mark.parametrize(
+    "level,event,random,expected",
+    [
+        (logging.DEBUG, "token_valid", 0.5, False),
+        (logging.DEBUG, "token_valid", 0.005, True),
+        (logging.ERROR, "token_valid", 0.5, True),
+        (logging.INFO, "login", 0.5, True),
+        (logging.INFO, None, 0.5, True),
+    ],
+)
+def test_sampling_filter(level, event, random, expected):
+    record = logging.makeLogRecord({"levelno": level, "event": event})
+
+    with patch("django_oac.logger.random.random", return_value=random):
+        assert SamplingFilter({"token_valid": 0.01}).filter(record) is expected
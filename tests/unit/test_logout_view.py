@@ -4,8 +4,16 @@ import pytest
 from django.contrib.auth.models import AnonymousUser
 from django.core.handlers.wsgi import WSGIRequest
 from django.shortcuts import reverse
-
-from django_oac.exceptions import ConfigurationError, ProviderResponseError
+from requests.exceptions import ConnectTimeout
+
+from django_oac.exceptions import (
+    CircuitOpenError,
+    ConfigurationError,
+    DeadlineExceededError,
+    ProviderResponseError,
+    RateLimitExceededError,
+)
+from django_oac.models import PendingRevocation
 from django_oac.views import logout_view
 
 
@@ -19,9 +27,10 @@ def _logout(request: WSGIRequest):
     "exception", [ConfigurationError, ProviderResponseError],
 )
 @patch("django_oac.views.logout")
-def test_logout_view_failure(mock_logout, exception, rf):
+@patch("django_oac.views.TokenProvider")
+def test_logout_view_failure(mock_token_provider, mock_logout, exception, rf):
     token = Mock()
-    token.revoke.side_effect = exception("foo")
+    mock_token_provider.return_value.revoke.side_effect = exception("foo")
     user = Mock()
     type(user).email = "spam@eggs"
     user.token_set.last.return_value = token
@@ -40,10 +49,12 @@ def test_logout_view_failure(mock_logout, exception, rf):
 
 # pylint: disable=invalid-name
 @patch("django_oac.views.logout")
-def test_logout_view_succeeded(mock_logout, rf):
+@patch("django_oac.views.TokenProvider")
+def test_logout_view_succeeded(mock_token_provider, mock_logout, rf):
+    token = Mock()
     user = Mock()
     type(user).email = "spam@eggs"
-    user.token_set.last.return_value = Mock()
+    user.token_set.last.return_value = token
 
     mock_logout.return_value = None
     mock_logout.side_effect = _logout
@@ -55,3 +66,38 @@ def test_logout_view_succeeded(mock_logout, rf):
     response = logout_view(request)
 
     assert response.status_code == 302
+    mock_token_provider.return_value.revoke.assert_called_once_with(token)
+
+
+# pylint: disable=invalid-name
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "exception",
+    [CircuitOpenError, DeadlineExceededError, RateLimitExceededError, ConnectTimeout],
+)
+@patch("django_oac.views.logout")
+@patch("django_oac.views.TokenProvider")
+def test_logout_view_provider_unreachable(
+    mock_token_provider, mock_logout, exception, rf
+):
+    token = Mock()
+    token.refresh_token = "foo"
+    mock_token_provider.return_value.revoke.side_effect = exception("bar")
+    user = Mock()
+    type(user).email = "spam@eggs"
+    user.token_set.last.return_value = token
+
+    mock_logout.side_effect = _logout
+
+    request = rf.get(reverse("django_oac:logout"))
+    request.session = {"OAC_STATE_STR": "test", "OAC_CLIENT_IP": "127.0.0.1"}
+    request.user = user
+
+    response = logout_view(request)
+
+    assert response.status_code == 302
+    mock_logout.assert_called_once()
+    token.delete.assert_called_once()
+    assert list(PendingRevocation.objects.values_list("refresh_token", flat=True)) == [
+        "foo"
+    ]
@@ -0,0 +1,115 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
+from unittest.mock import Mock
+
+import pytest
+import responses
+from django.core.cache import cache
+from django.shortcuts import reverse
+
+from django_oac.metrics import COUNTER, HISTOGRAM, Metrics, export_prometheus, metrics
+from django_oac.services import CacheJWKSService, OAuthRequestService
+
+
+def test_counters_summed_across_threads():
+    registry = Metrics()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        for _ in range(100):
+            executor.submit(registry.incr, "foo", bar="baz")
+
+    counters, _ = registry.collect()
+
+    assert counters == {("foo", (("bar", "baz"),)): 100}
+
+
+def test_finished_thread_shards_folded():
+    registry = Metrics()
+
+    for _ in range(10):
+        thread = Thread(target=registry.incr, args=("foo",))
+        thread.start()
+        thread.join()
+    registry.incr("foo")
+
+    counters, _ = registry.collect()
+
+    assert counters == {("foo", ()): 11}
+    assert len(registry._shards) == 1
+
+
+def test_histogram():
+    registry = Metrics(buckets=(0.1, 1))
+
+    for value in (0.05, 0.5, 0.5, 5):
+        registry.observe("foo", value)
+
+    _, histograms = registry.collect()
+
+    assert histograms == {("foo", ()): [1, 2, 4, 6.05]}
+
+
+def test_hook():
+    hook = Mock()
+    registry = Metrics(hook=hook)
+
+    registry.incr("foo", bar="baz")
+    registry.observe("spam", 0.5)
+
+    assert hook.call_args_list[0].args == (COUNTER, "foo", 1, {"bar": "baz"})
+    assert hook.call_args_list[1].args == (HISTOGRAM, "spam", 0.5, {})
+
+
+def test_export_prometheus():
+    registry = Metrics(buckets=(0.1, 1))
+    registry.incr("requests", endpoint="token", status=200)
+    registry.observe("duration_seconds", 0.5, endpoint="token")
+
+    assert export_prometheus(registry).splitlines() == [
+        "# TYPE django_oac_requests_total counter",
+        'django_oac_requests_total{endpoint="token",status="200"} 1',
+        "# TYPE django_oac_duration_seconds histogram",
+        'django_oac_duration_seconds_bucket{endpoint="token",le="0.1"} 0',
+        'django_oac_duration_seconds_bucket{endpoint="token",le="1"} 1',
+        'django_oac_duration_seconds_bucket{endpoint="token",le="+Inf"} 1',
+        'django_oac_duration_seconds_count{endpoint="token"} 1',
+        'django_oac_duration_seconds_sum{endpoint="token"} 0.5',
+    ]
+
+
+def test_cache_jwks_service_hit_ratio(oac_jwk):
+    metrics.clear()
+    oac_jwk.kid = "foo"
+    cache.set("bar", oac_jwk.jwks)
+
+    CacheJWKSService.fetch("foo", cache_key="bar")
+    CacheJWKSService.fetch("foo", cache_key="baz")
+
+    counters, _ = metrics.collect()
+
+    assert counters[("cache_requests", (("cache", "jwks"), ("result", "hit")))] == 1
+    assert counters[("cache_requests", (("cache", "jwks"), ("result", "miss")))] == 1
+
+
+@responses.activate
+def test_provider_call_metrics():
+    metrics.clear()
+    responses.add(responses.POST, "https://your.oauth.provider/revoke/", status=200)
+
+    OAuthRequestService.revoke_refresh_token("foo")
+
+    counters, histograms = metrics.collect()
+    request_key = ("provider_requests", (("endpoint", "revoke"), ("status", 200)))
+    call_key = ("provider_call_duration_seconds", (("call", "revoke_refresh_token"),))
+
+    assert counters[request_key] == 1
+    assert histograms[call_key][-2] == 1
+
+
+@pytest.mark.parametrize("enabled,expected_status_code", [(False, 404), (True, 200)])
+def test_metrics_view(enabled, expected_status_code, client, settings):
+    settings.OAC = {**settings.OAC, "METRICS_VIEW": enabled}
+
+    response = client.get(reverse("django_oac:metrics"))
+
+    assert response.status_code == expected_status_code
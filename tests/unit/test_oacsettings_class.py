@@ -22,3 +22,14 @@ def test_missing_setting(settings):
 
     with pytest.raises(ConfigurationError):
         assert oac_settings.AUTHORIZE_URI
+
+
+def test_stateless_state_requires_expiration(settings):
+    settings.OAC = {"STATELESS_STATE": True}
+    oac_settings = OACSettings(settings, {**DEFAULTS, "STATE_EXPIRES_IN": None})
+
+    with pytest.raises(ConfigurationError):
+        assert oac_settings.STATE_EXPIRES_IN
+
+    settings.OAC = {}
+    assert oac_settings.STATE_EXPIRES_IN is None
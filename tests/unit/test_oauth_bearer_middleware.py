@@ -0,0 +1,185 @@
+import time
+from unittest.mock import Mock
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from jwt.exceptions import InvalidSignatureError
+
+from django_oac.exceptions import ProviderResponseError
+from django_oac.middleware import OAuthBearerMiddleware
+from django_oac.services import CACHE_KEY
+
+from ..common import ID_TOKEN_PAYLOAD, USER_PAYLOAD
+
+UserModel = get_user_model()
+
+# Cases:
+#  - request without bearer token
+#  - valid bearer token
+#  - repeated bearer token served from verified tokens cache
+#  - invalid bearer token
+#  - rejected bearer token served from rejected tokens cache
+#  - bearer token not verified because provider failed
+#  - bearer token of unknown user
+#  - opaque bearer token
+
+
+# pylint: disable=invalid-name
+def test_no_bearer_token(rf, oac_mock_get_response):
+    user_provider = Mock()
+
+    request = rf.get("foo")
+    request.user = None
+
+    middleware = OAuthBearerMiddleware(
+        oac_mock_get_response, user_provider=user_provider
+    )
+
+    middleware(request)
+
+    user_provider.decode_id_token.assert_not_called()
+    assert request.user is None
+
+
+@pytest.mark.django_db
+def test_valid_bearer_token(rf, oac_jwt, oac_mock_get_response):
+    user = UserModel.objects.create(**USER_PAYLOAD)
+
+    oac_jwt.kid = "foo"
+    oac_jwt.id_token = {**ID_TOKEN_PAYLOAD, "exp": int(time.time()) + 3600}
+    cache.set(CACHE_KEY, oac_jwt.jwks)
+
+    request = rf.get("foo", HTTP_AUTHORIZATION=f"Bearer {oac_jwt.id_token}")
+
+    middleware = OAuthBearerMiddleware(oac_mock_get_response)
+
+    middleware(request)
+
+    assert request.user.pk == user.pk
+
+
+@pytest.mark.django_db
+def test_cached_bearer_token(rf, oac_mock_get_response):
+    user = UserModel.objects.create(**USER_PAYLOAD)
+
+    user_provider = Mock()
+    user_provider.decode_id_token.return_value = {
+        **ID_TOKEN_PAYLOAD,
+        "exp": time.time() + 3600,
+    }
+
+    middleware = OAuthBearerMiddleware(
+        oac_mock_get_response, user_provider=user_provider
+    )
+
+    for _ in range(2):
+        request = rf.get("foo", HTTP_AUTHORIZATION="Bearer foo")
+
+        middleware(request)
+
+        assert request.user.pk == user.pk
+
+    user_provider.decode_id_token.assert_called_once()
+
+
+@pytest.mark.parametrize("bearer_token", ["foo", ""])
+def test_invalid_bearer_token(bearer_token, rf, oac_mock_get_response):
+    request = rf.get("foo", HTTP_AUTHORIZATION=f"Bearer {bearer_token}")
+
+    middleware = OAuthBearerMiddleware(oac_mock_get_response)
+
+    response = middleware(request)
+
+    assert response.status_code == 401
+    assert response["WWW-Authenticate"] == 'Bearer error="invalid_token"'
+
+
+def test_rejected_bearer_token(rf, oac_mock_get_response):
+    user_provider = Mock()
+    user_provider.decode_id_token.side_effect = InvalidSignatureError
+
+    middleware = OAuthBearerMiddleware(
+        oac_mock_get_response, user_provider=user_provider
+    )
+
+    for _ in range(2):
+        request = rf.get("foo", HTTP_AUTHORIZATION="Bearer foo")
+
+        response = middleware(request)
+
+        assert response.status_code == 401
+
+    user_provider.decode_id_token.assert_called_once()
+
+
+def test_bearer_token_provider_failed(rf, oac_mock_get_response):
+    user_provider = Mock()
+    user_provider.decode_id_token.side_effect = ProviderResponseError
+
+    middleware = OAuthBearerMiddleware(
+        oac_mock_get_response, user_provider=user_provider
+    )
+
+    for _ in range(2):
+        request = rf.get("foo", HTTP_AUTHORIZATION="Bearer foo")
+
+        response = middleware(request)
+
+        assert response.status_code == 401
+
+    assert user_provider.decode_id_token.call_count == 2
+
+
+@pytest.mark.django_db
+def test_bearer_token_unknown_user(rf, oac_mock_get_response):
+    user_provider = Mock()
+    user_provider.decode_id_token.return_value = ID_TOKEN_PAYLOAD
+
+    request = rf.get("foo", HTTP_AUTHORIZATION="Bearer foo")
+
+    middleware = OAuthBearerMiddleware(
+        oac_mock_get_response, user_provider=user_provider
+    )
+
+    response = middleware(request)
+
+    assert response.status_code == 401
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "active,expected_authenticated", [(True, True), (False, False)]
+)
+def test_opaque_bearer_token(
+    active, expected_authenticated, rf, settings, oac_mock_get_response
+):
+    settings.OAC = {
+        **settings.OAC,
+        "INTROSPECT_URI": "https://your.oauth.provider/introspect/",
+    }
+
+    user = UserModel.objects.create(**USER_PAYLOAD)
+
+    user_provider = Mock()
+    introspection_service = Mock()
+    introspection_service.introspect.return_value = {
+        "active": active,
+        "email": user.email,
+    }
+
+    request = rf.get("foo", HTTP_AUTHORIZATION="Bearer foo")
+
+    middleware = OAuthBearerMiddleware(
+        oac_mock_get_response,
+        user_provider=user_provider,
+        introspection_service=introspection_service,
+    )
+
+    response = middleware(request)
+
+    user_provider.decode_id_token.assert_not_called()
+    if expected_authenticated:
+        assert request.user.pk == user.pk
+    else:
+        assert response.status_code == 401
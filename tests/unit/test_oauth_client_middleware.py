@@ -1,17 +1,30 @@
 import logging
 from unittest.mock import Mock, PropertyMock, patch
 
+import pendulum
+import pytest
+import responses
 from django.contrib.auth.models import AnonymousUser
+from django.utils import timezone
 
 from django_oac.apps import DjangoOACConfig
-from django_oac.exceptions import ProviderResponseError
+from django_oac.conf import settings as oac_settings
+from django_oac.exceptions import DeadlineExceededError, ProviderResponseError
 from django_oac.middleware import OAuthClientMiddleware
+from django_oac.models_providers.token_provider import DefaultTokenProvider
 
 # Cases:
 #  - not authenticated user
 #  - authenticated user without token
 #  - authenticated user with valid token
 #  - authenticated user with expired token
+#  - exempt path or method
+#  - lazily loaded token
+#  - recently checked token
+#  - authenticated user with token expired within grace period
+#  - authenticated user whose token was rejected in background
+#  - authenticated user with expired token and unreachable provider
+#  - authenticated user with expired token and unavailable provider
 
 
 # pylint: disable=invalid-name
@@ -34,6 +47,7 @@ def test_not_authenticated_user(rf, caplog, oac_mock_get_response):
 # pylint: disable=invalid-name
 def test_without_token(rf, caplog, oac_mock_get_response):
     user = Mock()
+    type(user).pk = 1
     type(user).email = "spam@eggs"
     user.token_set.last.return_value = None
 
@@ -49,7 +63,7 @@ def test_without_token(rf, caplog, oac_mock_get_response):
 
     middleware(request)
 
-    assert caplog.records[0].msg.startswith("no access token found")
+    assert caplog.records[0].getMessage().startswith("no access token found")
 
 
 def test_valid_token(rf, caplog, oac_mock_get_response):
@@ -72,7 +86,7 @@ def test_valid_token(rf, caplog, oac_mock_get_response):
 
     middleware(request)
 
-    assert caplog.records[0].msg.endswith("is valid")
+    assert caplog.records[0].getMessage().endswith("is valid")
 
 
 def test_expired_token_refresh_succeeded(rf, caplog, oac_mock_get_response):
@@ -95,8 +109,8 @@ def test_expired_token_refresh_succeeded(rf, caplog, oac_mock_get_response):
 
     middleware(request)
 
-    assert caplog.records[0].msg.endswith("has expired")
-    assert caplog.records[1].msg.endswith("has been refreshed")
+    assert caplog.records[0].getMessage().endswith("has expired")
+    assert caplog.records[1].getMessage().endswith("has been refreshed")
 
 
 @patch("django_oac.middleware.logout")
@@ -127,4 +141,305 @@ def test_expired_token_refresh_failed(mock_logout, rf, caplog, oac_mock_get_resp
 
     middleware(request)
 
-    assert caplog.records[0].msg.startswith("raised ProviderResponseError")
+    assert caplog.records[0].getMessage().startswith("raised ProviderResponseError")
+
+
+@pytest.mark.parametrize(
+    "method,path",
+    [("GET", "/static/foo.css"), ("GET", "/health/"), ("HEAD", "/foo/")],
+)
+def test_exempt_request(method, path, rf, settings, oac_mock_get_response):
+    settings.OAC = {
+        **settings.OAC,
+        "MIDDLEWARE_EXEMPT_PATHS": ["/static/", r"/health/$"],
+        "MIDDLEWARE_EXEMPT_METHODS": ["head"],
+    }
+
+    user = Mock()
+
+    request = rf.generic(method, path)
+    request.user = user
+
+    middleware = OAuthClientMiddleware(oac_mock_get_response)
+
+    middleware(request)
+
+    user.token_set.last.assert_not_called()
+
+
+def test_not_exempt_request(rf, settings, oac_mock_get_response):
+    settings.OAC = {
+        **settings.OAC,
+        "MIDDLEWARE_EXEMPT_PATHS": ["/static/", r"/health/$"],
+        "MIDDLEWARE_EXEMPT_METHODS": ["head"],
+    }
+
+    user = Mock()
+    type(user).pk = 1
+    user.token_set.last.return_value = None
+
+    request = rf.get("/health/foo/")
+    request.session = {
+        "OAC_STATE_STR": "test",
+        "OAC_CLIENT_IP": "127.0.0.1",
+    }
+    request.user = user
+
+    middleware = OAuthClientMiddleware(oac_mock_get_response)
+
+    middleware(request)
+
+    user.token_set.last.assert_called_once()
+
+
+def test_lazy_token(rf, settings, oac_mock_get_response):
+    settings.OAC = {**settings.OAC, "MIDDLEWARE_LAZY_TOKEN": True}
+
+    token = Mock()
+    type(token).has_expired = PropertyMock(return_value=False)
+    type(token).access_token = PropertyMock(return_value="foo")
+
+    user = Mock()
+    type(user).email = "spam@eggs"
+    user.token_set.last.return_value = token
+
+    request = rf.get("foo")
+    request.session = {
+        "OAC_STATE_STR": "test",
+        "OAC_CLIENT_IP": "127.0.0.1",
+    }
+    request.user = user
+
+    middleware = OAuthClientMiddleware(oac_mock_get_response)
+
+    middleware(request)
+
+    user.token_set.last.assert_not_called()
+    assert request.oac_token.access_token == "foo"
+    user.token_set.last.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    "checked_seconds_ago,expires_in,expected_lookup",
+    [(10, 3600, False), (70, 3600, True), (10, 30, True)],
+)
+def test_token_check_interval(
+    checked_seconds_ago,
+    expires_in,
+    expected_lookup,
+    rf,
+    settings,
+    oac_mock_get_response,
+):
+    settings.OAC = {**settings.OAC, "TOKEN_CHECK_INTERVAL": 60}
+
+    now = timezone.now()
+
+    token = Mock()
+    type(token).has_expired = PropertyMock(return_value=False)
+    type(token).expires_at = PropertyMock(
+        return_value=pendulum.instance(now).add(seconds=expires_in)
+    )
+
+    user = Mock()
+    type(user).email = "spam@eggs"
+    user.token_set.last.return_value = token
+
+    request = rf.get("foo")
+    request.session = {
+        "OAC_STATE_STR": "test",
+        "OAC_CLIENT_IP": "127.0.0.1",
+        "OAC_TOKEN_CHECK": (
+            now.timestamp() - checked_seconds_ago,
+            now.timestamp() + expires_in,
+        ),
+    }
+    request.user = user
+
+    middleware = OAuthClientMiddleware(oac_mock_get_response)
+
+    middleware(request)
+
+    assert user.token_set.last.called == expected_lookup
+    if expected_lookup:
+        assert request.session["OAC_TOKEN_CHECK"][0] >= now.timestamp()
+
+
+@pytest.mark.parametrize(
+    "expired_seconds_ago,expected_background", [(30, True), (90, False)]
+)
+@patch("django_oac.middleware.logout")
+def test_expired_token_grace_period(
+    mock_logout,
+    expired_seconds_ago,
+    expected_background,
+    rf,
+    settings,
+    oac_mock_get_response,
+):
+    settings.OAC = {**settings.OAC, "REFRESH_GRACE_PERIOD": 60}
+
+    token = Mock()
+    type(token).pk = PropertyMock(return_value=1)
+    type(token).has_expired = PropertyMock(return_value=True)
+    type(token).expires_at = PropertyMock(
+        return_value=pendulum.instance(timezone.now()).subtract(
+            seconds=expired_seconds_ago
+        )
+    )
+
+    user = Mock()
+    type(user).email = "spam@eggs"
+    user.token_set.last.return_value = token
+
+    token_provider = Mock()
+    executor = Mock()
+
+    request = rf.get("foo")
+    request.session = {
+        "OAC_STATE_STR": "test",
+        "OAC_CLIENT_IP": "127.0.0.1",
+    }
+    request.user = user
+
+    middleware = OAuthClientMiddleware(
+        oac_mock_get_response, token_provider=token_provider, executor=executor
+    )
+
+    middleware(request)
+    middleware(request)
+
+    if expected_background:
+        executor.submit.assert_called_once()
+        token_provider.refresh.assert_not_called()
+    else:
+        executor.submit.assert_not_called()
+        assert token_provider.refresh.call_count == 2
+    mock_logout.assert_not_called()
+
+
+def test_background_refresh_failed(caplog):
+    token = Mock()
+    type(token).pk = PropertyMock(return_value=1)
+    type(token).user_id = PropertyMock(return_value=2)
+
+    token_provider = Mock()
+    token_provider.refresh.side_effect = ProviderResponseError("foo")
+
+    middleware = OAuthClientMiddleware(
+        Mock(), token_provider=token_provider, executor=Mock()
+    )
+
+    middleware.refresh(token, logging.getLogger(DjangoOACConfig.name))
+
+    token.delete.assert_called_once()
+    assert caplog.records[0].getMessage().startswith("raised ProviderResponseError")
+
+
+@patch("django_oac.middleware.logout")
+def test_background_refresh_rejected_logs_out(
+    mock_logout, rf, caplog, oac_mock_get_response
+):
+    token = Mock()
+    type(token).pk = PropertyMock(return_value=1)
+    type(token).user_id = PropertyMock(return_value=2)
+
+    token_provider = Mock()
+    token_provider.refresh.side_effect = ProviderResponseError("foo")
+
+    user = Mock()
+    type(user).pk = PropertyMock(return_value=2)
+    type(user).email = "spam@eggs"
+    user.token_set.last.return_value = None
+
+    middleware = OAuthClientMiddleware(
+        oac_mock_get_response, token_provider=token_provider, executor=Mock()
+    )
+    middleware.refresh(token, logging.getLogger(DjangoOACConfig.name))
+
+    caplog.set_level(logging.INFO, logger=DjangoOACConfig.name)
+    for _ in range(2):
+        request = rf.get("foo")
+        request.session = {
+            "OAC_STATE_STR": "test",
+            "OAC_CLIENT_IP": "127.0.0.1",
+        }
+        request.user = user
+
+        middleware(request)
+
+    mock_logout.assert_called_once()
+    assert caplog.records[-2].getMessage().startswith(
+        "refresh token of user 'spam@eggs' has been rejected"
+    )
+    assert caplog.records[-1].getMessage().startswith("no access token found")
+
+
+@patch("django_oac.middleware.logout")
+def test_expired_token_provider_unreachable(
+    mock_logout, rf, caplog, oac_mock_get_response
+):
+    token = Mock()
+    type(token).has_expired = PropertyMock(return_value=True)
+
+    user = Mock()
+    type(user).email = "spam@eggs"
+    user.token_set.last.return_value = token
+
+    token_provider = Mock()
+    token_provider.refresh.side_effect = DeadlineExceededError("foo")
+
+    request = rf.get("foo")
+    request.session = {
+        "OAC_STATE_STR": "test",
+        "OAC_CLIENT_IP": "127.0.0.1",
+    }
+    request.user = user
+
+    caplog.set_level(logging.ERROR, logger=DjangoOACConfig.name)
+    middleware = OAuthClientMiddleware(
+        oac_mock_get_response, token_provider=token_provider
+    )
+
+    middleware(request)
+
+    token.delete.assert_not_called()
+    mock_logout.assert_not_called()
+    assert (
+        caplog.records[0]
+        .getMessage()
+        .startswith("raised django_oac.exceptions.DeadlineExceededError")
+    )
+
+
+@patch("django_oac.services.time.sleep")
+@patch("django_oac.middleware.logout")
+@responses.activate
+def test_expired_token_provider_unavailable(
+    mock_logout, mock_sleep, rf, oac_mock_get_response
+):
+    responses.add(responses.POST, oac_settings.TOKEN_URI, status=503)
+
+    token = Mock()
+    type(token).has_expired = PropertyMock(return_value=True)
+
+    user = Mock()
+    type(user).email = "spam@eggs"
+    user.token_set.last.return_value = token
+
+    request = rf.get("foo")
+    request.session = {
+        "OAC_STATE_STR": "test",
+        "OAC_CLIENT_IP": "127.0.0.1",
+    }
+    request.user = user
+
+    middleware = OAuthClientMiddleware(
+        oac_mock_get_response, token_provider=DefaultTokenProvider()
+    )
+
+    middleware(request)
+
+    assert request.oac_token is token
+    token.delete.assert_not_called()
+    mock_logout.assert_not_called()
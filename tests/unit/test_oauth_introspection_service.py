@@ -0,0 +1,44 @@
+import time
+
+import pytest
+import responses
+
+from django_oac.exceptions import ProviderResponseError
+from django_oac.services import OAuthIntrospectionService
+
+INTROSPECT_URI = "https://your.oauth.provider/introspect/"
+
+
+@pytest.mark.parametrize(
+    "json_dict,expected_active",
+    [
+        ({"active": True, "email": "spam@eggs"}, True),
+        ({"active": True, "exp": time.time() - 1}, False),
+        ({"active": False}, False),
+    ],
+)
+@responses.activate
+def test_introspect_cached(json_dict, expected_active):
+    responses.add(responses.POST, INTROSPECT_URI, json=json_dict, status=200)
+
+    service = OAuthIntrospectionService()
+
+    for _ in range(2):
+        data = service.introspect("foo", introspect_uri=INTROSPECT_URI)
+
+        assert data["active"] == expected_active
+
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_introspect_failed():
+    responses.add(responses.POST, INTROSPECT_URI, json={"foo": "bar"}, status=400)
+
+    service = OAuthIntrospectionService()
+
+    for _ in range(2):
+        with pytest.raises(ProviderResponseError):
+            service.introspect("foo", introspect_uri=INTROSPECT_URI)
+
+    assert len(responses.calls) == 2
@@ -49,3 +49,22 @@ def test_save():
 
     with pytest.raises(NotImplementedError):
         service.save("foo")
+
+
+@patch("django_oac.services.requests")
+def test_fetch_within_refetch_interval(mock_requests, oac_jwk):
+    oac_jwk.kid = "foo"
+
+    response = Mock()
+    type(response).status_code = PropertyMock(return_value=200)
+    type(response).content = PropertyMock(return_value=oac_jwk.jwks)
+
+    mock_requests.get.return_value = response
+
+    service = OAuthJWKSService()
+    jwk, _ = service.fetch("foo")
+    unknown_jwk, _ = service.fetch("spam")
+
+    assert jwk == oac_jwk.jwk
+    assert unknown_jwk is None
+    mock_requests.get.assert_called_once()
@@ -1,3 +1,5 @@
+from unittest.mock import patch
+
 import pytest
 import responses
 
@@ -95,3 +97,13 @@ def test_revoke_refresh_token_failed():
 
     with pytest.raises(ProviderResponseError):
         service.revoke_refresh_token("spam")
+
+
+@patch("django_oac.services.requests")
+def test_request_timeout(mock_requests):
+    mock_requests.post.return_value.status_code = 200
+
+    service = OAuthRequestService()
+    service.revoke_refresh_token("spam")
+
+    assert mock_requests.post.call_args[1]["timeout"] == (3.05, 10)
@@ -0,0 +1,64 @@
+import time
+from unittest.mock import patch
+
+import pytest
+import responses
+
+from django_oac.exceptions import ProviderResponseError
+from django_oac.services import OAuthUserInfoService
+
+from ..common import USER_PAYLOAD
+
+USERINFO_URI = "https://your.oauth.provider/userinfo/"
+
+
+@responses.activate
+def test_fetch_cached():
+    responses.add(responses.GET, USERINFO_URI, json=USER_PAYLOAD, status=200)
+
+    service = OAuthUserInfoService()
+
+    for _ in range(2):
+        claims = service.fetch("foo", "spam@eggs", userinfo_uri=USERINFO_URI)
+
+        assert claims == USER_PAYLOAD
+
+    assert len(responses.calls) == 1
+    assert responses.calls[0].request.headers["Authorization"] == "Bearer foo"
+    assert service.get("spam@eggs") == USER_PAYLOAD
+
+
+@responses.activate
+def test_fetch_revalidated(settings):
+    settings.OAC = {**settings.OAC, "USERINFO_CACHE_TIMEOUT": 60}
+
+    responses.add(
+        responses.GET,
+        USERINFO_URI,
+        json=USER_PAYLOAD,
+        status=200,
+        headers={"ETag": '"bar"'},
+    )
+    responses.add(responses.GET, USERINFO_URI, status=304)
+
+    service = OAuthUserInfoService()
+    service.fetch("foo", "spam@eggs", userinfo_uri=USERINFO_URI)
+
+    with patch("django_oac.services.time.time", return_value=time.time() + 61):
+        claims = service.fetch("foo", "spam@eggs", userinfo_uri=USERINFO_URI)
+
+    assert claims == USER_PAYLOAD
+    assert len(responses.calls) == 2
+    assert responses.calls[1].request.headers["If-None-Match"] == '"bar"'
+
+
+@responses.activate
+def test_fetch_failed():
+    responses.add(responses.GET, USERINFO_URI, json={"foo": "bar"}, status=401)
+
+    service = OAuthUserInfoService()
+
+    with pytest.raises(ProviderResponseError):
+        service.fetch("foo", "spam@eggs", userinfo_uri=USERINFO_URI)
+
+    assert service.get("spam@eggs") is None
@@ -1,12 +1,17 @@
 import json
-from unittest.mock import Mock
+import time
+from unittest.mock import Mock, patch
 
+import pytest
+from django.contrib.auth import get_user_model
 from django.shortcuts import reverse
 
 from django_oac.views import profile_view
 
 from ..common import USER_PAYLOAD
 
+UserModel = get_user_model()
+
 
 # pylint: disable=invalid-name
 def test_profile_view(rf):
@@ -24,3 +29,89 @@ def test_profile_view(rf):
 
     assert response.status_code == 200
     assert json.loads(response.content) == USER_PAYLOAD
+
+
+# pylint: disable=invalid-name
+@pytest.mark.django_db
+def test_profile_view_not_modified(rf):
+    user = UserModel.objects.create(**USER_PAYLOAD)
+
+    request = rf.get(reverse("django_oac:profile"))
+    request.user = user
+
+    etag = profile_view(request)["ETag"]
+
+    request = rf.get(reverse("django_oac:profile"), HTTP_IF_NONE_MATCH=etag)
+    request.user = user
+
+    response = profile_view(request)
+
+    assert response.status_code == 304
+
+
+# pylint: disable=invalid-name
+@pytest.mark.django_db
+def test_profile_view_modified(rf):
+    user = UserModel.objects.create(**USER_PAYLOAD)
+
+    request = rf.get(reverse("django_oac:profile"))
+    request.user = user
+
+    etag = profile_view(request)["ETag"]
+
+    user.first_name = "ham"
+    user.save()
+
+    request = rf.get(reverse("django_oac:profile"), HTTP_IF_NONE_MATCH=etag)
+    request.user = user
+
+    response = profile_view(request)
+
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+    assert json.loads(response.content)["first_name"] == "ham"
+
+
+# pylint: disable=invalid-name
+@pytest.mark.django_db
+def test_profile_view_version_expired(rf):
+    user = UserModel.objects.create(**USER_PAYLOAD)
+
+    request = rf.get(reverse("django_oac:profile"))
+    request.user = user
+
+    etag = profile_view(request)["ETag"]
+
+    # update does not send post_save, version expiry picks the change up
+    UserModel.objects.filter(pk=user.pk).update(first_name="ham")
+    user.refresh_from_db()
+
+    with patch("time.time", return_value=time.time() + 301):
+        request = rf.get(reverse("django_oac:profile"), HTTP_IF_NONE_MATCH=etag)
+        request.user = user
+
+        response = profile_view(request)
+
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+    assert json.loads(response.content)["first_name"] == "ham"
+
+
+# pylint: disable=invalid-name
+@pytest.mark.django_db
+def test_profile_view_cached(rf, settings):
+    settings.OAC = {**settings.OAC, "PROFILE_CACHE_TIMEOUT": 60}
+
+    user = UserModel.objects.create(**USER_PAYLOAD)
+
+    request = rf.get(reverse("django_oac:profile"))
+    request.user = user
+
+    profile_view(request)
+
+    UserModel.objects.filter(pk=user.pk).update(first_name="ham")
+    user.refresh_from_db()
+
+    response = profile_view(request)
+
+    assert json.loads(response.content) == USER_PAYLOAD
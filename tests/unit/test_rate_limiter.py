@@ -0,0 +1,77 @@
+from unittest.mock import patch
+
+import pytest
+
+from django_oac.exceptions import RateLimitExceededError
+from django_oac.resilience import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_REVOCATION,
+    RateLimiter,
+)
+
+
+class FakeClock:
+    __slots__ = ("now",)
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def fake_clock() -> FakeClock:
+    clock = FakeClock()
+    with patch("django_oac.resilience.time", clock):
+        yield clock
+
+
+def test_disabled():
+    rate_limiter = RateLimiter()
+
+    for _ in range(100):
+        rate_limiter.acquire()
+
+
+@pytest.mark.parametrize(
+    "priority,expected_allowed",
+    [(PRIORITY_INTERACTIVE, 10), (PRIORITY_BACKGROUND, 8), (PRIORITY_REVOCATION, 5)],
+)
+def test_priority_shares(priority, expected_allowed, fake_clock):
+    rate_limiter = RateLimiter(rate=10, max_wait=0.5)
+
+    for _ in range(expected_allowed):
+        rate_limiter.acquire(priority)
+
+    with pytest.raises(RateLimitExceededError):
+        rate_limiter.acquire(priority)
+
+
+def test_rejected_requests_do_not_consume_limit(fake_clock):
+    rate_limiter = RateLimiter(rate=10, max_wait=0.5)
+
+    for _ in range(5):
+        rate_limiter.acquire(PRIORITY_REVOCATION)
+    for _ in range(5):
+        with pytest.raises(RateLimitExceededError):
+            rate_limiter.acquire(PRIORITY_REVOCATION)
+
+    for _ in range(5):
+        rate_limiter.acquire(PRIORITY_INTERACTIVE)
+
+
+def test_queued_until_next_window(fake_clock):
+    rate_limiter = RateLimiter(rate=1, max_wait=1.5)
+
+    rate_limiter.acquire()
+    rate_limiter.acquire()
+
+    assert fake_clock.now == 1001.0
@@ -0,0 +1,168 @@
+from email.utils import formatdate
+from time import time
+from unittest.mock import Mock, patch
+
+import pytest
+import responses
+from requests.exceptions import ConnectionError as RequestsConnectionError
+
+from django_oac.conf import settings as oac_settings
+from django_oac.deadline import deadline
+from django_oac.exceptions import ProviderResponseError, ProviderUnavailableError
+from django_oac.services import OAuthJWKSService, OAuthRequestService, get_retry_after
+
+
+@pytest.mark.parametrize(
+    "headers,expected_retry_after",
+    [
+        ({}, None),
+        ({"Retry-After": "1.5"}, 1.5),
+        ({"Retry-After": "foo"}, None),
+    ],
+)
+def test_get_retry_after(headers, expected_retry_after):
+    response = Mock()
+    response.headers = headers
+
+    retry_after = get_retry_after(response)
+
+    assert retry_after == expected_retry_after
+
+
+def test_get_retry_after_http_date():
+    response = Mock()
+    response.headers = {"Retry-After": formatdate(time() + 60, usegmt=True)}
+
+    assert get_retry_after(response) == pytest.approx(60, abs=1)
+
+
+@patch("django_oac.services.time.sleep")
+@responses.activate
+def test_idempotent_request_retried(mock_sleep, oac_jwk):
+    oac_jwk.kid = "foo"
+    responses.add(responses.GET, oac_settings.JWKS_URI, body=RequestsConnectionError())
+    responses.add(responses.GET, oac_settings.JWKS_URI, status=503)
+    responses.add(responses.GET, oac_settings.JWKS_URI, body=oac_jwk.jwks, status=200)
+
+    jwk, _ = OAuthJWKSService().fetch("foo")
+
+    assert jwk == oac_jwk.jwk
+    assert len(responses.calls) == 3
+    assert mock_sleep.call_count == 2
+
+
+@patch("django_oac.services.time.sleep")
+@responses.activate
+def test_retry_attempts_exhausted(mock_sleep):
+    responses.add(responses.POST, oac_settings.REVOKE_URI, status=503)
+
+    with pytest.raises(ProviderUnavailableError):
+        OAuthRequestService().revoke_refresh_token("spam")
+
+    assert len(responses.calls) == oac_settings.RETRY_MAX_ATTEMPTS
+    assert mock_sleep.call_count == oac_settings.RETRY_MAX_ATTEMPTS - 1
+
+
+@patch("django_oac.services.time.sleep")
+@responses.activate
+def test_retry_after_honored(mock_sleep):
+    responses.add(
+        responses.POST,
+        oac_settings.REVOKE_URI,
+        status=429,
+        headers={"Retry-After": "1"},
+    )
+    responses.add(responses.POST, oac_settings.REVOKE_URI, status=200)
+
+    OAuthRequestService().revoke_refresh_token("spam")
+
+    mock_sleep.assert_called_once_with(1)
+
+
+@pytest.mark.parametrize("retry_after", ["60", "1"])
+@patch("django_oac.services.time.sleep")
+@responses.activate
+def test_retry_after_too_long(mock_sleep, retry_after):
+    responses.add(
+        responses.POST,
+        oac_settings.REVOKE_URI,
+        status=429,
+        headers={"Retry-After": retry_after},
+    )
+
+    with deadline(0.5):
+        with pytest.raises(ProviderUnavailableError):
+            OAuthRequestService().revoke_refresh_token("spam")
+
+    assert len(responses.calls) == 1
+    mock_sleep.assert_not_called()
+
+
+@patch("django_oac.services.time.sleep")
+@responses.activate
+def test_non_idempotent_request_not_retried(mock_sleep):
+    responses.add(responses.POST, oac_settings.TOKEN_URI, status=503)
+
+    with pytest.raises(ProviderResponseError):
+        OAuthRequestService().get_access_token("spam")
+
+    assert len(responses.calls) == 1
+    mock_sleep.assert_not_called()
+
+
+@patch("django_oac.services.time.sleep")
+@responses.activate
+def test_refresh_retried_when_provider_unavailable(mock_sleep):
+    responses.add(
+        responses.POST,
+        oac_settings.TOKEN_URI,
+        status=429,
+        headers={"Retry-After": "1"},
+    )
+    responses.add(
+        responses.POST,
+        oac_settings.TOKEN_URI,
+        json={"access_token": "foo", "refresh_token": "bar", "expires_in": 3600},
+    )
+
+    data = OAuthRequestService().refresh_access_token("spam")
+
+    assert data["access_token"] == "foo"
+    mock_sleep.assert_called_once_with(1)
+
+
+@patch("django_oac.services.time.sleep")
+@responses.activate
+def test_refresh_not_retried_after_connection_error(mock_sleep):
+    responses.add(
+        responses.POST, oac_settings.TOKEN_URI, body=RequestsConnectionError()
+    )
+
+    with pytest.raises(RequestsConnectionError):
+        OAuthRequestService().refresh_access_token("spam")
+
+    assert len(responses.calls) == 1
+
+
+@patch("django_oac.services.time.sleep")
+@responses.activate
+def test_refresh_provider_unavailable(mock_sleep):
+    responses.add(responses.POST, oac_settings.TOKEN_URI, status=503)
+
+    with pytest.raises(ProviderUnavailableError):
+        OAuthRequestService().refresh_access_token("spam")
+
+    assert len(responses.calls) == oac_settings.RETRY_MAX_ATTEMPTS
+
+
+@pytest.mark.parametrize("status", [502, 504])
+@patch("django_oac.services.time.sleep")
+@responses.activate
+def test_refresh_not_retried_after_gateway_error(mock_sleep, status):
+    responses.add(responses.POST, oac_settings.TOKEN_URI, status=status)
+
+    with pytest.raises(ProviderUnavailableError):
+        OAuthRequestService().refresh_access_token("spam")
+
+    assert len(responses.calls) == 1
+    mock_sleep.assert_not_called()
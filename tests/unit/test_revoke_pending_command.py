@@ -0,0 +1,60 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from django_oac.exceptions import ProviderResponseError
+from django_oac.models import PendingRevocation
+
+
+@pytest.mark.django_db
+@patch("django_oac.management.commands.oac_revoke_pending.OAuthRequestService")
+def test_revoke_pending_succeeded(mock_service):
+    PendingRevocation.objects.bulk_create(
+        [PendingRevocation(refresh_token=f"foo{i}") for i in range(3)]
+    )
+    out = StringIO()
+
+    call_command("oac_revoke_pending", "--batch-size", "2", stdout=out)
+
+    assert not PendingRevocation.objects.exists()
+    assert mock_service.return_value.revoke_refresh_token.call_count == 3
+    assert out.getvalue().splitlines() == [
+        "revoked: 2, failed: 0",
+        "revoked: 1, failed: 0",
+    ]
+
+
+@pytest.mark.django_db
+@patch("django_oac.management.commands.oac_revoke_pending.OAuthRequestService")
+def test_revoke_pending_failed(mock_service):
+    mock_service.return_value.revoke_refresh_token.side_effect = ProviderResponseError(
+        "foo"
+    )
+    revocation = PendingRevocation.objects.create(refresh_token="foo")
+
+    call_command("oac_revoke_pending", stdout=StringIO())
+
+    revocation.refresh_from_db()
+    assert revocation.attempts == 1
+    assert revocation.last_error == "ProviderResponseError: foo"
+    assert revocation.next_attempt > timezone.now() + timedelta(seconds=50)
+    assert mock_service.return_value.revoke_refresh_token.call_count == 1
+
+
+@pytest.mark.django_db
+@patch("django_oac.management.commands.oac_revoke_pending.OAuthRequestService")
+def test_revoke_pending_skips_exhausted(mock_service, settings):
+    settings.OAC = {**settings.OAC, "REVOCATION_MAX_ATTEMPTS": 2}
+    PendingRevocation.objects.create(refresh_token="foo", attempts=2)
+    PendingRevocation.objects.create(
+        refresh_token="bar", next_attempt=timezone.now() + timedelta(minutes=1)
+    )
+
+    call_command("oac_revoke_pending", stdout=StringIO())
+
+    assert PendingRevocation.objects.count() == 2
+    mock_service.return_value.revoke_refresh_token.assert_not_called()
@@ -0,0 +1,103 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+
+from django_oac.exceptions import ProviderResponseError
+from django_oac.models import Token
+
+UserModel = get_user_model()
+
+
+def _create_token(email: str, refresh_token: str, age: int = 0) -> Token:
+    user, _ = UserModel.objects.get_or_create(email=email, username=email)
+
+    return Token.objects.create(
+        access_token="foo",
+        refresh_token=refresh_token,
+        expires_in=3600,
+        issued=timezone.now() - timedelta(seconds=age),
+        user=user,
+    )
+
+
+def test_revoke_tokens_requires_filter():
+    with pytest.raises(CommandError):
+        call_command("oac_revoke_tokens", stdout=StringIO())
+
+
+@pytest.mark.django_db
+@patch("django_oac.management.commands.oac_revoke_tokens.OAuthRequestService")
+def test_revoke_tokens_of_user(mock_service):
+    _create_token("spam@eggs", "foo")
+    _create_token("spam@eggs", "bar")
+    _create_token("ham@eggs", "baz")
+    out = StringIO()
+
+    call_command(
+        "oac_revoke_tokens", "--user", "spam@eggs", "--batch-size", "1", stdout=out
+    )
+
+    assert list(Token.objects.values_list("refresh_token", flat=True)) == ["baz"]
+    assert sorted(
+        call.args[0]
+        for call in mock_service.return_value.revoke_refresh_token.call_args_list
+    ) == ["bar", "foo"]
+    assert out.getvalue().splitlines()[-1].startswith("revoked: 2, failed: 0,")
+
+
+@pytest.mark.django_db
+@patch("django_oac.management.commands.oac_revoke_tokens.OAuthRequestService")
+def test_revoke_tokens_older_than(mock_service):
+    _create_token("spam@eggs", "foo", age=7200)
+    _create_token("ham@eggs", "bar")
+
+    call_command(
+        "oac_revoke_tokens", "--older-than", "3600", "--rate", "100", stdout=StringIO()
+    )
+
+    assert list(Token.objects.values_list("refresh_token", flat=True)) == ["bar"]
+    mock_service.return_value.revoke_refresh_token.assert_called_once_with("foo")
+
+
+@pytest.mark.django_db
+@patch("django_oac.management.commands.oac_revoke_tokens.OAuthRequestService")
+def test_revoke_tokens_keeps_failed(mock_service):
+    mock_service.return_value.revoke_refresh_token.side_effect = [
+        None,
+        ProviderResponseError("foo"),
+    ]
+    _create_token("spam@eggs", "foo")
+    _create_token("ham@eggs", "bar")
+    out = StringIO()
+
+    call_command("oac_revoke_tokens", "--all", "--concurrency", "1", stdout=out)
+
+    assert list(Token.objects.values_list("refresh_token", flat=True)) == ["bar"]
+    assert out.getvalue().splitlines()[-1].startswith("revoked: 1, failed: 1,")
+
+
+@pytest.mark.django_db
+@patch("django_oac.management.commands.oac_revoke_tokens.OAuthRequestService")
+def test_revoke_tokens_in_batches(mock_service):
+    for index in range(5):
+        _create_token(f"spam{index}@eggs", f"foo{index}")
+    out = StringIO()
+
+    call_command(
+        "oac_revoke_tokens",
+        "--all",
+        "--batch-size",
+        "2",
+        "--concurrency",
+        "1",
+        stdout=out,
+    )
+
+    assert not Token.objects.exists()
+    assert mock_service.return_value.revoke_refresh_token.call_count == 5
+    assert out.getvalue().splitlines()[-1].startswith("revoked: 5, failed: 0,")
@@ -0,0 +1,109 @@
+import re
+import time
+from unittest.mock import Mock, PropertyMock
+
+from django.http import HttpResponse
+from django.utils.functional import SimpleLazyObject
+
+from django_oac.middleware import OAuthClientMiddleware
+from django_oac.server_timing import (
+    NOOP_TIMER,
+    add_header,
+    collect_timings,
+    server_timing,
+    timing,
+)
+
+
+def test_timing_without_collector():
+    assert timing("foo") is NOOP_TIMER
+
+
+def test_collect_timings():
+    with collect_timings() as timings:
+        with timing("foo"):
+            pass
+        with timing("foo"):
+            pass
+        with collect_timings() as nested_timings:
+            with timing("bar"):
+                pass
+
+    assert nested_timings is None
+    assert list(timings) == ["foo", "bar"]
+
+
+def test_add_header():
+    response = HttpResponse()
+    response["Server-Timing"] = "app;dur=5"
+
+    add_header(response, {"foo": 0.0012, "bar": 0.5})
+
+    assert response["Server-Timing"] == "app;dur=5, foo;dur=1.2, bar;dur=500.0"
+
+
+def test_server_timing_disabled(rf):
+    view = server_timing(lambda request: HttpResponse())
+
+    response = view(rf.get("foo"))
+
+    assert not response.has_header("Server-Timing")
+
+
+def test_server_timing_enabled(rf, settings):
+    settings.OAC = {**settings.OAC, "SERVER_TIMING": True}
+
+    def view(request):
+        with timing("foo"):
+            return HttpResponse()
+
+    response = server_timing(view)(rf.get("foo"))
+
+    assert re.fullmatch(r"foo;dur=\d+\.\d", response["Server-Timing"])
+
+
+def test_middleware_server_timing(rf, settings):
+    settings.OAC = {**settings.OAC, "SERVER_TIMING": True}
+
+    token = Mock()
+    type(token).has_expired = PropertyMock(return_value=False)
+    user = Mock()
+    type(user).email = "spam@eggs"
+    user.token_set.last.return_value = token
+
+    request = rf.get("foo")
+    request.session = {"OAC_STATE_STR": "test", "OAC_CLIENT_IP": "127.0.0.1"}
+    request.user = user
+
+    middleware = OAuthClientMiddleware(lambda request: HttpResponse())
+
+    response = middleware(request)
+
+    assert [
+        metric.split(";")[0] for metric in response["Server-Timing"].split(", ")
+    ] == ["oac-user-lookup", "oac-token-lookup"]
+
+
+def test_middleware_server_timing_lazy_user(rf, settings):
+    settings.OAC = {**settings.OAC, "SERVER_TIMING": True}
+
+    user = Mock()
+    type(user).pk = 1
+    type(user).email = "spam@eggs"
+    user.token_set.last.return_value = None
+
+    def load_user():
+        time.sleep(0.05)
+        return user
+
+    request = rf.get("foo")
+    request.session = {"OAC_STATE_STR": "test", "OAC_CLIENT_IP": "127.0.0.1"}
+    request.user = SimpleLazyObject(load_user)
+
+    middleware = OAuthClientMiddleware(lambda request: HttpResponse())
+
+    response = middleware(request)
+
+    user_lookup = response["Server-Timing"].split(", ")[0]
+    assert user_lookup.startswith("oac-user-lookup;dur=")
+    assert float(user_lookup.split("=")[1]) >= 50
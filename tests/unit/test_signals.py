@@ -0,0 +1,142 @@
+from unittest.mock import Mock, patch
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.dispatch import Signal
+from django.utils import timezone
+
+from django_oac.exceptions import ProviderRequestError, ProviderResponseError
+from django_oac.models import Token
+from django_oac.models_providers.token_provider import DefaultTokenProvider
+from django_oac.models_providers.user_provider import DefaultUserProvider
+from django_oac.signals import (
+    send,
+    token_issued,
+    token_refresh_failed,
+    token_refreshed,
+    token_revoked,
+    user_created,
+)
+
+from ..common import ID_TOKEN_PAYLOAD, TOKEN_PAYLOAD, USER_PAYLOAD
+
+UserModel = get_user_model()
+
+
+@pytest.fixture
+def connect():
+    connected = []
+
+    def connect_receiver(signal: Signal) -> Mock:
+        receiver = Mock()
+        signal.connect(receiver, dispatch_uid=id(receiver))
+        connected.append((signal, receiver))
+        return receiver
+
+    yield connect_receiver
+
+    for signal, receiver in connected:
+        signal.disconnect(receiver, dispatch_uid=id(receiver))
+
+
+def _create_token() -> Token:
+    return Token.objects.create(
+        issued=timezone.now(),
+        user=UserModel.objects.create(**USER_PAYLOAD),
+        **TOKEN_PAYLOAD,
+    )
+
+
+def test_send_without_listeners():
+    signal = Signal()
+
+    with patch.object(signal, "send") as mock_send:
+        send(signal, DefaultTokenProvider, foo="bar")
+
+    mock_send.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_token_issued(connect):
+    receiver = connect(token_issued)
+    oauth_request_service = Mock()
+    oauth_request_service.get_access_token.return_value = {
+        **TOKEN_PAYLOAD,
+        "id_token": "baz",
+    }
+    user = UserModel.objects.create(**USER_PAYLOAD)
+    user_provider = Mock()
+    user_provider.get_or_create.return_value = user, True
+
+    provider = DefaultTokenProvider(oauth_request_service=oauth_request_service)
+    token = provider.create("foo", user_provider=user_provider)
+
+    kwargs = receiver.call_args.kwargs
+    assert kwargs["sender"] is DefaultTokenProvider
+    assert kwargs["token"] == token
+    assert kwargs["user"] == user
+    assert kwargs["outcome"] == "success"
+    assert kwargs["elapsed"] >= 0
+
+
+@pytest.mark.django_db
+def test_token_refreshed(connect):
+    receiver = connect(token_refreshed)
+    oauth_request_service = Mock()
+    oauth_request_service.refresh_access_token.return_value = TOKEN_PAYLOAD
+    token = _create_token()
+
+    DefaultTokenProvider(oauth_request_service=oauth_request_service).refresh(token)
+
+    assert receiver.call_args.kwargs["token"] == token
+    assert receiver.call_args.kwargs["outcome"] == "success"
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "exception,expected_outcome",
+    [(ProviderResponseError, "rejected"), (ProviderRequestError, "failed")],
+)
+def test_token_refresh_failed(exception, expected_outcome, connect):
+    receiver = connect(token_refresh_failed)
+    oauth_request_service = Mock()
+    oauth_request_service.refresh_access_token.side_effect = exception("foo")
+    token = _create_token()
+
+    with pytest.raises(exception):
+        DefaultTokenProvider(oauth_request_service=oauth_request_service).refresh(token)
+
+    assert receiver.call_args.kwargs["outcome"] == expected_outcome
+    assert isinstance(receiver.call_args.kwargs["error"], exception)
+
+
+@pytest.mark.django_db
+def test_token_revoked(connect):
+    receiver = connect(token_revoked)
+    token = _create_token()
+
+    DefaultTokenProvider(oauth_request_service=Mock()).revoke(token)
+
+    assert receiver.call_args.kwargs["token"] is token
+    assert receiver.call_args.kwargs["error"] is None
+    assert receiver.call_args.kwargs["outcome"] == "success"
+    assert not Token.objects.exists()
+
+
+@pytest.mark.django_db
+def test_user_created(connect, oac_jwt):
+    receiver = connect(user_created)
+    oac_jwt.kid = "foo"
+    oac_jwt.id_token = ID_TOKEN_PAYLOAD
+    mock_jwks_service = Mock()
+    mock_jwks_service.fetch.return_value = oac_jwt.jwk, oac_jwt.jwks
+
+    user, _ = DefaultUserProvider().get_or_create(
+        oac_jwt.id_token,
+        fetch_from_services=[mock_jwks_service, mock_jwks_service],
+        save_by_service=mock_jwks_service,
+    )
+
+    assert receiver.call_args.kwargs["user"] == user
+    assert receiver.call_args.kwargs["claims"]["email"] == ID_TOKEN_PAYLOAD["email"]
+    assert receiver.call_args.kwargs["outcome"] == "success"
@@ -17,3 +17,13 @@ def test_has_expired_property():
     token = Token.objects.create(**payload)
 
     assert token.has_expired
+
+
+@pytest.mark.django_db
+def test_expires_at_property():
+    issued = timezone.now()
+    token = Token.objects.create(
+        access_token="foo", refresh_token="bar", expires_in=3600, issued=issued
+    )
+
+    assert token.expires_at == pendulum.instance(issued).add(seconds=3600)
@@ -0,0 +1,79 @@
+from contextlib import contextmanager
+from unittest.mock import Mock, patch
+
+import pytest
+import responses
+
+from django_oac import tracing
+from django_oac.exceptions import ConfigurationError
+from django_oac.services import OAuthRequestService
+from django_oac.tracing import NOOP_SPAN, get_tracer, span, traced
+
+
+class FakeTracer:
+    def __init__(self):
+        self.spans = []
+
+    @contextmanager
+    def start_as_current_span(self, name, attributes=None):
+        current_span = Mock()
+        self.spans.append((name, attributes, current_span))
+        yield current_span
+
+
+@pytest.fixture
+def fake_tracer():
+    tracer = FakeTracer()
+    with patch("django_oac.tracing.get_tracer", return_value=tracer):
+        yield tracer
+
+
+@pytest.fixture(autouse=True)
+def clear_tracer_cache():
+    get_tracer.cache_clear()
+    yield
+    get_tracer.cache_clear()
+
+
+def test_span_disabled():
+    with span("foo") as current_span:
+        current_span.set_attribute("bar", "baz")
+
+    assert current_span is NOOP_SPAN
+
+
+def test_get_tracer_enabled(settings):
+    settings.OAC = {**settings.OAC, "TRACING": True}
+
+    with patch.object(tracing, "trace") as mock_trace:
+        assert get_tracer() is mock_trace.get_tracer.return_value
+
+    mock_trace.get_tracer.assert_called_once_with("django_oac")
+
+
+def test_get_tracer_without_opentelemetry(settings):
+    settings.OAC = {**settings.OAC, "TRACING": True}
+
+    with patch.object(tracing, "trace", None), pytest.raises(ConfigurationError):
+        get_tracer()
+
+
+def test_traced(fake_tracer):
+    @traced("foo")
+    def func(arg):
+        return arg
+
+    assert func("bar") == "bar"
+    assert [name for name, _, _ in fake_tracer.spans] == ["foo"]
+
+
+@responses.activate
+def test_provider_request_span(fake_tracer):
+    responses.add(responses.POST, "https://your.oauth.provider/revoke/", status=200)
+
+    OAuthRequestService.revoke_refresh_token("foo")
+
+    name, attributes, current_span = fake_tracer.spans[0]
+    assert name == "POST revoke"
+    assert attributes["oac.attempt"] == 1
+    current_span.set_attribute.assert_called_once_with("http.status_code", 200)